@@ -0,0 +1,112 @@
+"""
+End-to-end latency benchmark against the local fake Gemini server.
+
+Each scenario runs the hotkey workload (chunk_text + synthesize_chunks, as
+SpeechPipeline does) with playback simulated in real time, and reports:
+
+  ttfa      time from start to the first audio
+  total     time until the simulated playback ends
+  stalls    playback time lost waiting for audio after it started
+  requests  requests per key that reached the server
+  wasted    requests the server rejected (429/403/500)
+
+No quota is used and no audio device is needed. HOME is pointed at a
+temporary directory so the real key state and cache are left alone.
+
+Usage: python benchmarks/bench_e2e.py [--scenario NAME] [--latency 1.5]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ["HOME"] = tempfile.mkdtemp(prefix="echoclip-bench-")
+# Keeps the shared key state (see echoclip.coordination) away from real processes
+os.environ["XDG_RUNTIME_DIR"] = os.environ["HOME"]
+
+from fake_gemini import FakeGemini, FakeGeminiServer
+
+from echoclip.config import config
+from echoclip.chunker import chunk_text
+from echoclip.pipeline import synthesize_chunks, BYTES_PER_SECOND
+
+# Per-request logs (including the expected injected errors) would drown the table
+logging.getLogger().setLevel(logging.CRITICAL)
+
+PARAGRAPH = (
+    "The committee met on Tuesday to review the proposal. After a long discussion, "
+    "the members agreed that the budget needed another pass before the vote. "
+    "Several questions about the timeline remain open, and the next meeting was set for Friday."
+)
+
+SCENARIOS = {
+    # name: (text, keys, server rpm, 429 rate, 500 rate, invalid keys)
+    "clip": (PARAGRAPH[:160], 3, 10, 0.0, 0.0, 0),
+    "article": ("\n\n".join([PARAGRAPH] * 4), 3, 10, 0.0, 0.0, 0),
+    "flaky": ("\n\n".join([PARAGRAPH] * 4), 3, 10, 0.10, 0.05, 0),
+    "bad-key": ("\n\n".join([PARAGRAPH] * 4), 3, 10, 0.0, 0.0, 1),
+    "tight-rpm": ("\n\n".join([PARAGRAPH] * 4), 2, 3, 0.0, 0.0, 0),
+}
+
+async def consume(text: str):
+    """Plays synthesize_chunks() output on a simulated real-time clock."""
+    start = time.monotonic()
+    first_audio = None
+    play_until = None
+    stalls = 0.0
+    async for audio in synthesize_chunks(chunk_text(text)):
+        now = time.monotonic()
+        if first_audio is None:
+            first_audio = now - start
+            play_until = now
+        elif now > play_until:
+            stalls += now - play_until
+        play_until = max(now, play_until) + len(audio) / BYTES_PER_SECOND
+    end = max(play_until or 0.0, time.monotonic())
+    return first_audio, end - start, stalls
+
+def run(name: str, fake: FakeGemini):
+    text, key_count, rpm, rate_429, rate_500, invalid = SCENARIOS[name]
+    # Fresh keys per scenario, so no rate-limit state carries over
+    keys = [f"{name}-key-{i}" for i in range(key_count)]
+    fake.reset_stats()
+    fake.rpm = rpm
+    fake.error_rate_429 = rate_429
+    fake.error_rate_500 = rate_500
+    fake.invalid_keys = set(keys[:invalid])
+    config.gemini_api_keys = keys
+    config._config["rate_limits"] = {"rpm": rpm, "tpm": 10**6}
+
+    first_audio, total, stalls = asyncio.run(consume(text))
+    stats = fake.stats()
+    requests = " ".join(str(stats["requests"].get(key, 0)) for key in keys)
+    wasted = sum(stats["rejected"].values())
+    ttfa = f"{first_audio:.2f}s" if first_audio is not None else "-"
+    print(f"{name:>10} {ttfa:>8} {total:>7.2f}s {stalls:>7.2f}s {requests:>10} {wasted:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="Run only this scenario (repeatable)")
+    parser.add_argument("--latency", type=float, default=1.5, help="Fake batch request latency in seconds")
+    parser.add_argument("--first-chunk-latency", type=float, default=0.6)
+    args = parser.parse_args()
+
+    fake = FakeGemini(latency=args.latency, first_chunk_latency=args.first_chunk_latency, seed=1)
+    server = FakeGeminiServer(fake)
+    config._config["gemini"]["base_url"] = server.start()
+    config._config.setdefault("cache", {})["enabled"] = False
+
+    print(f"{'scenario':>10} {'ttfa':>8} {'total':>8} {'stalls':>8} {'requests':>10} {'wasted':>7}")
+    try:
+        for name in args.scenario or SCENARIOS:
+            run(name, fake)
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
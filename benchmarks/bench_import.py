@@ -0,0 +1,102 @@
+"""
+CLI startup benchmark and guard, based on `python -X importtime`.
+
+Each scenario imports what one kind of command loads, in a fresh
+interpreter, and reports:
+
+  median    import time of those modules (site/startup imports excluded)
+  modules   number of modules imported
+  heaviest  packages with the most self time
+
+Scenarios other than `start` must not import the heavy dependencies
+(google-genai, numpy, sounddevice, pynput, pyperclip); the script exits
+with status 1 if one does, or if `cli` exceeds --budget milliseconds.
+
+Usage: python benchmarks/bench_import.py [--runs 5] [--budget 400]
+"""
+import os
+import re
+import sys
+import argparse
+import tempfile
+import statistics
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    # name: (modules imported, guarded against heavy imports)
+    "cli": (["echoclip.main"], True),  # Paid by every command, including --help
+    "speak": (["echoclip.main", "echoclip.ipc"], True),
+    "stats": (["echoclip.main", "echoclip.metrics", "echoclip.keys"], True),
+    "start": (["echoclip.main", "echoclip.input_handler", "echoclip.daemon"], False),
+}
+
+HEAVY = ["google.genai", "numpy", "sounddevice", "pynput", "pyperclip"]
+
+MARKER = "-- echoclip imports --"
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+def measure(modules: List[str]) -> Tuple[float, List[Tuple[str, int]]]:
+    """Imports `modules` in a fresh interpreter. Returns (total seconds, [(module, self µs)])."""
+    code = f"import sys; sys.stderr.write({MARKER!r} + '\\n'); " + "; ".join(f"import {m}" for m in modules)
+    path = os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))
+    env = dict(os.environ, HOME=tempfile.mkdtemp(prefix="echoclip-bench-"), PYTHONPATH=path)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+    lines = result.stderr.splitlines()
+    total = 0
+    imported = []
+    for line in lines[lines.index(MARKER) + 1:]:
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        imported.append((name, self_us))
+        if not indent:
+            total += cumulative_us
+    return total / 1e6, imported
+
+def heaviest(imported: List[Tuple[str, int]], count: int = 3) -> str:
+    by_package: Dict[str, int] = defaultdict(int)
+    for name, self_us in imported:
+        by_package[name.split(".")[0]] += self_us
+    top = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:count]
+    return ", ".join(f"{package} {us / 1000:.0f}ms" for package, us in top)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="Run only this scenario (repeatable)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per scenario (median is reported)")
+    parser.add_argument("--budget", type=float, default=None, help="Fail if `cli` takes longer than this many milliseconds")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'scenario':>10} {'median':>9} {'modules':>8}  heaviest")
+    for name in args.scenario or SCENARIOS:
+        modules, guarded = SCENARIOS[name]
+        runs = [measure(modules) for _ in range(args.runs)]
+        median = statistics.median(total for total, _ in runs)
+        imported = runs[-1][1]
+        print(f"{name:>10} {median * 1000:>7.1f}ms {len(imported):>8}  {heaviest(imported)}")
+
+        names = {module for module, _ in imported}
+        if guarded:
+            for heavy in HEAVY:
+                if heavy in names:
+                    failures.append(f"{name}: imports {heavy}")
+        if name == "cli" and args.budget is not None and median * 1000 > args.budget:
+            failures.append(f"cli: {median * 1000:.0f}ms is over the {args.budget:.0f}ms budget")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
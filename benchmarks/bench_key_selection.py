@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: cost of KeyManager.get_best_key versus key pool size.
+
+Every key's window is pre-filled with requests spread over the last minute,
+then get_best_key is timed and compared against the previous list-based
+accounting (rebuild + sum on every call).
+
+Usage: python benchmarks/bench_key_selection.py
+"""
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from echoclip.config import config
+from echoclip.keys import KeyManager
+
+POOL_SIZES = [1, 10, 50, 200, 1000]
+ENTRIES_PER_KEY = 100
+CALLS = 200
+
+def legacy_select(request_timestamps, token_timestamps, keys, now, rpm_limit, tpm_limit):
+    """The list-based accounting get_best_key used before RateWindow."""
+    best_key, lowest = None, float("inf")
+    for key in keys:
+        request_timestamps[key] = [t for t in request_timestamps[key] if t > now - 60]
+        token_timestamps[key] = [(t, v) for t, v in token_timestamps[key] if t > now - 60]
+        rpm_load = len(request_timestamps[key]) / rpm_limit
+        tpm_load = sum(t[1] for t in token_timestamps[key]) / tpm_limit
+        score = max(rpm_load, tpm_load)
+        if score < lowest:
+            best_key, lowest = key, score
+    return best_key
+
+def run(pool_size: int, state_dir: Path):
+    keys = [f"bench-key-{i:05d}" for i in range(pool_size)]
+    config.gemini_api_keys = keys
+    config._config["rate_limits"] = {"rpm": ENTRIES_PER_KEY * 2, "tpm": 10**9}
+    config._config["coordination"] = {"path": str(state_dir / f"shared-{pool_size}.json")}
+
+    manager = KeyManager(state_file=state_dir / f"state-{pool_size}.json")
+    now = time.time()
+    request_timestamps, token_timestamps = {}, {}
+    for key in keys:
+        window = manager._window(key, now)
+        request_timestamps[key], token_timestamps[key] = [], []
+        for j in range(ENTRIES_PER_KEY):
+            ts = now - 59 + j * (59 / ENTRIES_PER_KEY)
+            window.record(ts, 50)
+            request_timestamps[key].append(ts)
+            token_timestamps[key].append((ts, 50))
+
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        manager.get_best_key(50)
+    current = (time.perf_counter() - start) / CALLS
+
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        legacy_select(request_timestamps, token_timestamps, keys, time.time(), ENTRIES_PER_KEY * 2, 10**9)
+    legacy = (time.perf_counter() - start) / CALLS
+
+    return current, legacy
+
+def main():
+    print(f"{'keys':>6} {'get_best_key':>14} {'legacy lists':>14} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in POOL_SIZES:
+            current, legacy = run(size, Path(tmp))
+            print(f"{size:>6} {current * 1e6:>11.1f} us {legacy * 1e6:>11.1f} us {legacy / current:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
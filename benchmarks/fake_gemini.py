@@ -0,0 +1,269 @@
+"""
+Local stand-in for the Gemini TTS endpoints, for tuning without spending quota.
+
+Serves `models/{model}:generateContent` and `:streamGenerateContent` (SSE)
+with synthetic PCM whose length follows the text, configurable latency,
+per-key RPM enforcement and random 429/403/500 injection. Point EchoClip at it
+with `base_url` in the [gemini] section of the config.
+
+Usage: python benchmarks/fake_gemini.py --port 8765 --rpm 10 --latency 1.5
+"""
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Iterable, Optional
+
+import numpy as np
+
+SAMPLE_RATE = 24000
+
+class FakeGemini:
+    """Behaviour and counters of the fake endpoint; shared by all handler threads."""
+    def __init__(
+        self,
+        latency: float = 1.5,
+        jitter: float = 0.3,
+        first_chunk_latency: float = 0.6,
+        rpm: int = 0,
+        error_rate_429: float = 0.0,
+        error_rate_500: float = 0.0,
+        invalid_keys: Iterable[str] = (),
+        chars_per_second: float = 15.0,
+        stream_pieces: int = 4,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.first_chunk_latency = first_chunk_latency
+        self.rpm = rpm
+        self.error_rate_429 = error_rate_429
+        self.error_rate_500 = error_rate_500
+        self.invalid_keys = set(invalid_keys)
+        self.chars_per_second = chars_per_second
+        self.stream_pieces = stream_pieces
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.windows: Dict[str, Deque[float]] = {}
+        self.requests: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        # One second of a quiet 220 Hz tone, tiled to the needed length
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        self.tone = (np.sin(2 * np.pi * 220 * t) * 3000).astype(np.int16).tobytes()
+
+    def reset_stats(self):
+        with self.lock:
+            self.windows.clear()
+            self.requests.clear()
+            self.rejected.clear()
+
+    def admit(self, key: str):
+        """Returns None if the request may proceed, else (status, message, retry_delay)."""
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            error = None
+            if key in self.invalid_keys:
+                error = (403, "API key not valid. Please pass a valid API key.", None)
+            elif self.rpm > 0:
+                now = time.monotonic()
+                window = self.windows.setdefault(key, deque())
+                while window and window[0] <= now - 60:
+                    window.popleft()
+                if len(window) >= self.rpm:
+                    error = (429, "Resource has been exhausted (e.g. check quota).", window[0] + 60 - now)
+                else:
+                    window.append(now)
+            if error is None:
+                roll = self.random.random()
+                if roll < self.error_rate_429:
+                    error = (429, "Resource has been exhausted (e.g. check quota).", 5.0)
+                elif roll < self.error_rate_429 + self.error_rate_500:
+                    error = (500, "An internal error has occurred.", None)
+            if error is not None:
+                self.rejected[key] = self.rejected.get(key, 0) + 1
+            return error
+
+    def delay(self, base: float) -> float:
+        return max(0.0, base + self.random.uniform(-self.jitter, self.jitter))
+
+    def pcm(self, text: str) -> bytes:
+        size = int(len(text) / self.chars_per_second * SAMPLE_RATE) * 2
+        repeats = size // len(self.tone) + 1
+        return (self.tone * repeats)[:size]
+
+    def usage(self, text: str, audio_bytes: int) -> Dict[str, int]:
+        prompt_tokens = max(1, round(len(text.split()) * 1.4))
+        audio_tokens = round(audio_bytes / (SAMPLE_RATE * 2) * 25)
+        return {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": audio_tokens,
+            "totalTokenCount": prompt_tokens + audio_tokens,
+        }
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {"requests": dict(self.requests), "rejected": dict(self.rejected)}
+
+def _response(audio: bytes, usage: Optional[Dict[str, int]] = None) -> Dict:
+    body = {
+        "candidates": [{
+            "content": {
+                "role": "model",
+                "parts": [{"inlineData": {
+                    "mimeType": f"audio/L16;codec=pcm;rate={SAMPLE_RATE}",
+                    "data": base64.b64encode(audio).decode("ascii"),
+                }}],
+            },
+        }],
+    }
+    if usage:
+        body["usageMetadata"] = usage
+    return body
+
+def _error(status: int, message: str, retry_delay: Optional[float]) -> Dict:
+    names = {403: "PERMISSION_DENIED", 429: "RESOURCE_EXHAUSTED", 500: "INTERNAL"}
+    error = {"code": status, "message": message, "status": names.get(status, "UNKNOWN")}
+    if retry_delay is not None:
+        error["details"] = [{
+            "@type": "type.googleapis.com/google.rpc.RetryInfo",
+            "retryDelay": f"{max(1, round(retry_delay))}s",
+        }]
+    return {"error": error}
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeGemini
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client hung up mid-response (a cancelled hedge or a stopped stream)
+            self.close_connection = True
+
+    def _send_json(self, status: int, body: Dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        key = self.headers.get("x-goog-api-key", "")
+        path = self.path.split("?", 1)[0]
+        text = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+
+        if path.endswith(":generateContent"):
+            self._generate(key, text)
+        elif path.endswith(":streamGenerateContent"):
+            self._stream(key, text)
+        else:
+            self._send_json(404, _error(404, f"Unknown method {path}", None))
+
+    def _generate(self, key: str, text: str):
+        fake = self.fake
+        error = fake.admit(key)
+        if error:
+            time.sleep(fake.delay(0.05))
+            self._send_json(error[0], _error(*error))
+            return
+        time.sleep(fake.delay(fake.latency))
+        audio = fake.pcm(text)
+        self._send_json(200, _response(audio, fake.usage(text, len(audio))))
+
+    def _stream(self, key: str, text: str):
+        fake = self.fake
+        error = fake.admit(key)
+        if error:
+            time.sleep(fake.delay(0.05))
+            self._send_json(error[0], _error(*error))
+            return
+
+        time.sleep(fake.delay(fake.first_chunk_latency))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        audio = fake.pcm(text)
+        pieces = max(1, fake.stream_pieces)
+        size = -(-len(audio) // pieces) // 2 * 2 or 2
+        # The rest of the audio arrives over what remains of a batch request's latency
+        gap = max(0.0, fake.latency - fake.first_chunk_latency) / pieces
+        for i, start in enumerate(range(0, len(audio), size)):
+            if i:
+                time.sleep(gap)
+            last = start + size >= len(audio)
+            body = _response(audio[start:start + size], fake.usage(text, len(audio)) if last else None)
+            event = f"data: {json.dumps(body)}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+class FakeGeminiServer:
+    """Runs a FakeGemini on a background thread."""
+    def __init__(self, fake: Optional[FakeGemini] = None, host: str = "127.0.0.1", port: int = 0):
+        self.fake = fake or FakeGemini()
+        handler = type("Handler", (_Handler,), {"fake": self.fake})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.5, help="Seconds per batch request")
+    parser.add_argument("--first-chunk-latency", type=float, default=0.6, help="Seconds to the first streamed piece")
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--rpm", type=int, default=0, help="Per-key requests per minute (0 = unlimited)")
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-500", type=float, default=0.0)
+    parser.add_argument("--invalid-key", action="append", default=[], help="Key answered with 403 (repeatable)")
+    args = parser.parse_args()
+
+    fake = FakeGemini(
+        latency=args.latency, jitter=args.jitter, first_chunk_latency=args.first_chunk_latency,
+        rpm=args.rpm, error_rate_429=args.error_rate_429, error_rate_500=args.error_rate_500,
+        invalid_keys=args.invalid_key,
+    )
+    server = FakeGeminiServer(fake, args.host, args.port)
+    print(f"Fake Gemini listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(fake.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
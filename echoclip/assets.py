@@ -1,5 +1,11 @@
+import threading
+import concurrent.futures
 from pathlib import Path
+from typing import Dict, List, Optional
+from echoclip.config import config
 from echoclip.client import tts_client
+from echoclip.persistence import atomic_write
+from echoclip.lazy import lazy_singletons
 from echoclip.logger import logger
 
 ASSETS_DIR = Path.home() / ".local/share/echoclip/assets"
@@ -11,24 +17,82 @@ SYSTEM_MESSAGES = {
     "exhausted.pcm": "All keys exhausted."
 }
 
-def generate_system_sounds():
-    """Generates system sound assets if they don't exist."""
-    ASSETS_DIR.mkdir(parents=True, exist_ok=True)
-    
-    for filename, text in SYSTEM_MESSAGES.items():
-        file_path = ASSETS_DIR / filename
-        if not file_path.exists():
-            logger.info(f"Generating asset: {filename}...")
+def get_asset_path(filename: str, voice_id: Optional[str] = None) -> Path:
+    """Assets are stored per voice, so switching voices never plays a stale one."""
+    return ASSETS_DIR / (voice_id or config.voice_id) / filename
+
+def _generate_asset(filename: str, voice_id: str) -> bool:
+    logger.info(f"Generating asset: {filename}...")
+    try:
+        audio_data = tts_client.generate_speech(SYSTEM_MESSAGES[filename], voice_id=voice_id)
+        if audio_data:
+            atomic_write(get_asset_path(filename, voice_id), audio_data)
+            logger.info(f"Generated {filename}")
+            return True
+        logger.error(f"Failed to generate {filename}")
+    except Exception as e:
+        logger.error(f"Failed to generate {filename}: {e}")
+    return False
+
+def generate_system_sounds(voice_id: Optional[str] = None) -> List[str]:
+    """
+    Generates the system sound assets for the voice that don't exist yet.
+    Requests run in parallel; the key scheduler spreads them across the pool.
+    Returns the filenames that were generated.
+    """
+    voice_id = voice_id or config.voice_id
+    missing = [name for name in SYSTEM_MESSAGES if not get_asset_path(name, voice_id).exists()]
+    if not missing:
+        return []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(missing)) as executor:
+        results = executor.map(lambda name: _generate_asset(name, voice_id), missing)
+        return [name for name, ok in zip(missing, results) if ok]
+
+class AssetStore:
+    """
+    System sounds for the configured voice, loaded into memory once so a
+    hotkey press plays them without touching the disk.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.voice_id: Optional[str] = None
+        self.sounds: Dict[str, bytes] = {}
+        self.generating = False
+
+    def _load(self, voice_id: str):
+        sounds = {}
+        for name in SYSTEM_MESSAGES:
+            path = get_asset_path(name, voice_id)
             try:
-                audio_data = tts_client.generate_speech(text)
-                if audio_data:
-                    with open(file_path, "wb") as f:
-                        f.write(audio_data)
-                    logger.info(f"Generated {filename}")
-                else:
-                    logger.error(f"Failed to generate {filename}")
-            except Exception as e:
-                logger.error(f"Failed to generate {filename}: {e}")
-
-def get_asset_path(filename: str) -> Path:
-    return ASSETS_DIR / filename
+                sounds[name] = path.read_bytes()
+            except OSError:
+                pass
+        with self.lock:
+            self.voice_id = voice_id
+            self.sounds = sounds
+
+    def _generate_and_reload(self, voice_id: str):
+        try:
+            if generate_system_sounds(voice_id):
+                self._load(voice_id)
+        finally:
+            self.generating = False
+
+    def prepare(self, generate_missing: bool = True):
+        """
+        Loads the current voice's sounds. Missing ones are generated in the
+        background and picked up when ready.
+        """
+        voice_id = config.voice_id
+        self._load(voice_id)
+        if generate_missing and len(self.sounds) < len(SYSTEM_MESSAGES) and not self.generating:
+            self.generating = True
+            threading.Thread(target=self._generate_and_reload, args=(voice_id,), daemon=True).start()
+
+    def get(self, filename: str) -> Optional[bytes]:
+        if self.voice_id != config.voice_id:
+            self.prepare()
+        return self.sounds.get(filename)
+
+__getattr__ = lazy_singletons(__name__, {"asset_store": AssetStore})
@@ -1,120 +1,318 @@
 import sounddevice as sd
 import numpy as np
 import threading
+import time
+from typing import Callable, Dict, Optional
+from echoclip.config import config
+from echoclip.dsp import AudioProcessor
+from echoclip.metrics import metrics
+from echoclip.lazy import lazy_singletons
 from echoclip.logger import logger
 
+SAMPLE_RATE = 24000
+BUFFER_SECONDS = 10
+BLOCK_SIZE = 512  # ~21ms per callback at 24kHz
+IDLE_SECONDS = 30  # Pause the stream after this much silence
+PROCESS_BLOCK = 4096  # Samples per DSP block
+
+class RingBuffer:
+    """
+    Preallocated single-producer/single-consumer ring of int16 samples.
+
+    The feeder thread writes and the audio callback reads. Positions are
+    monotonically increasing sample counters, each advanced by one side only,
+    so neither side needs a lock.
+    """
+    def __init__(self, capacity: int):
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.reset()
+
+    def reset(self):
+        self.read_pos = 0
+        self.write_pos = 0
+        self.eof = False
+
+    def available(self) -> int:
+        return self.write_pos - self.read_pos
+
+    def free(self) -> int:
+        return self.capacity - self.available()
+
+    def write(self, samples: np.ndarray) -> int:
+        """Copies as many samples as fit; returns how many were written."""
+        count = min(len(samples), self.free())
+        if count <= 0:
+            return 0
+        start = self.write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:count - first] = samples[first:count]
+        self.write_pos += count
+        return count
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Copies up to len(out) samples into out; returns how many were read. Never blocks."""
+        count = min(len(out), self.available())
+        if count <= 0:
+            return 0
+        start = self.read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        out[first:count] = self.buffer[:count - first]
+        self.read_pos += count
+        return count
+
+class _Program:
+    """Playback state of one play_stream() call, shared with the audio callback."""
+    def __init__(self, on_first_audio: Optional[Callable[[float], None]]):
+        self.on_first_audio = on_first_audio
+        self.first_audio_time: Optional[float] = None
+        self.done = False
+        self.underruns = 0
+
 class AudioPlayer:
+    """
+    Plays audio through a single long-lived OutputStream.
+
+    The stream's callback mixes the current program (speech fed through the
+    ring buffer) with short cues, so switching programs or playing a cue
+    never reopens the device. The stream pauses itself after a stretch of
+    silence and is restarted on demand.
+    """
     def __init__(self):
         self.current_stream = None
         self.stop_event = threading.Event()
+        # Wakes play_stream on first audio, end of program or stop (no polling)
+        self.wake = threading.Event()
         self.lock = threading.Lock()
-        self.q = None
+        self.ring = RingBuffer(SAMPLE_RATE * BUFFER_SECONDS)
+        self.mix = np.zeros(BLOCK_SIZE, dtype=np.int32)
+        self.program: Optional[_Program] = None
+        # Last program the callback saw; lets play_stream know the old one is released
+        self.seen_program: Optional[_Program] = None
+        self.switched = threading.Event()
+        self.cue: Optional[np.ndarray] = None
+        self.cue_pos = 0
+        self.idle_frames = 0
+        self.underruns = 0
+        self.overruns = 0
+
+    def _callback(self, outdata, frames, time_info, status):
+        out = outdata[:, 0]
+        program = self.program
+        if program is not self.seen_program:
+            self.seen_program = program
+            self.switched.set()
 
-    def play_stream(self, audio_iterator, sample_rate: int = 24000):
+        filled = 0
+        if program is not None and not program.done and not self.stop_event.is_set():
+            filled = self.ring.read_into(out)
+            if filled and program.first_audio_time is None:
+                program.first_audio_time = time.monotonic()
+                self.wake.set()
+            if filled < frames:
+                if self.ring.eof and self.ring.available() == 0:
+                    program.done = True
+                    self.wake.set()
+                elif program.first_audio_time is not None:
+                    # Buffer underrun - play silence
+                    program.underruns += 1
+        out[filled:] = 0
+
+        # Overlay the cue, saturating instead of wrapping around
+        cue = self.cue
+        if cue is not None:
+            count = min(frames, len(cue) - self.cue_pos, len(self.mix))
+            mix = self.mix[:count]
+            np.add(out[:count], cue[self.cue_pos:self.cue_pos + count], out=mix, dtype=np.int32)
+            np.clip(mix, -32768, 32767, out=mix)
+            out[:count] = mix
+            self.cue_pos += count
+            if self.cue_pos >= len(cue):
+                self.cue = None
+            filled = max(filled, count)
+
+        if filled or (program is not None and not program.done):
+            self.idle_frames = 0
+        else:
+            self.idle_frames += frames
+            if self.idle_frames >= IDLE_SECONDS * SAMPLE_RATE:
+                raise sd.CallbackStop()
+
+    def _ensure_running(self) -> bool:
+        """Opens the stream on first use and restarts it if it paused. Caller holds self.lock."""
+        try:
+            if self.current_stream is None:
+                self.current_stream = sd.OutputStream(
+                    samplerate=SAMPLE_RATE, channels=1, dtype='int16',
+                    blocksize=BLOCK_SIZE, latency='low', callback=self._callback,
+                    finished_callback=self.wake.set
+                )
+            if not self.current_stream.active:
+                if not self.current_stream.stopped:
+                    self.current_stream.stop()
+                self.idle_frames = 0
+                self.current_stream.start()
+            return True
+        except Exception as e:
+            logger.error(f"Error starting audio stream: {e}")
+            self.current_stream = None
+            return False
+
+    def _release_program(self):
+        """Detaches the current program and waits until the callback has let go of the ring."""
+        self.switched.clear()
+        self.program = None
+        if self.current_stream is not None and self.current_stream.active and self.seen_program is not None:
+            self.switched.wait(timeout=0.5)
+
+    def play_stream(self, audio_iterator, sample_rate: int = SAMPLE_RATE, on_first_audio: Optional[Callable[[float], None]] = None):
         """
-        Plays audio from an iterator using a callback-based OutputStream.
-        This is robust against large chunks and allows immediate interruption.
+        Plays audio from an iterator, blocking until it ends or stop() is called.
+        A feeder thread copies the iterator's PCM into a preallocated ring
+        buffer; the audio callback only does bounded, vectorized reads from it.
+        on_first_audio is called with the time.monotonic() at which the first
+        samples were handed to the device.
         """
-        self.stop() # Stop any currently playing audio
-        
-        import queue
-        self.q = queue.Queue(maxsize=20) # Buffer a few chunks
-        self.stop_event.clear()
-        
-        # Generator to feed the queue from the iterator
+        if sample_rate != SAMPLE_RATE:
+            logger.warning(f"Unsupported sample rate {sample_rate}; playing at {SAMPLE_RATE}")
+
+        self.stop_program() # Cues keep playing
+
+        ring = self.ring
+        program = _Program(on_first_audio)
+        # Set when this call returns, so a lingering feeder never writes into the next program
+        finished_feeding = threading.Event()
+
+        def stopped() -> bool:
+            return self.stop_event.is_set() or finished_feeding.is_set()
+
+        def write(samples: np.ndarray):
+            """Copies samples into the ring, waiting while it is full."""
+            offset = 0
+            while offset < len(samples) and not stopped():
+                offset += ring.write(samples[offset:])
+                if offset < len(samples):
+                    # Buffer full: sleep until a quarter of it has played
+                    self.overruns += 1
+                    metrics.increment("audio.overruns")
+                    self.stop_event.wait(ring.capacity / 4 / SAMPLE_RATE)
+
+        # Runs the iterator's audio through the DSP stage into the ring
         def audio_feeder():
+            pending = b""
+            processor = AudioProcessor(config.audio_speed, config.audio_volume, SAMPLE_RATE)
             try:
                 for i, chunk in enumerate(audio_iterator):
-                    if self.stop_event.is_set():
+                    if stopped():
                         break
-                    
-                    # Convert to numpy
-                    data = np.frombuffer(chunk, dtype=np.int16)
+
+                    # Keep a trailing odd byte for the next chunk
+                    if pending:
+                        chunk = pending + chunk
+                    usable = len(chunk) - len(chunk) % 2
+                    pending = chunk[usable:]
+
+                    # Zero-copy view of the PCM bytes
+                    data = np.frombuffer(chunk, dtype=np.int16, count=usable // 2)
                     logger.info(f"Received audio chunk {i}: {len(data)} samples")
-                    
-                    # If chunk is huge, split it before putting in queue to avoid blocking
-                    # But queue stores objects, so size doesn't matter much for blocking,
-                    # EXCEPT if the callback needs to process it.
-                    # Better to feed smaller chunks to queue so callback stays responsive?
-                    # Actually, the callback asks for N frames. We need a buffer adapter.
-                    
-                    self.q.put(data)
-                    
-                self.q.put(None) # Sentinel for end of stream
+
+                    # Queue depth as each chunk arrives (recorded here, never in the callback)
+                    metrics.observe("audio.buffered", ring.available() / SAMPLE_RATE)
+
+                    for start in range(0, len(data), PROCESS_BLOCK):
+                        if stopped():
+                            break
+                        write(processor.process(data[start:start + PROCESS_BLOCK]))
+
+                if not stopped():
+                    write(processor.flush())
             except Exception as e:
                 logger.error(f"Error in audio feeder: {e}")
-                self.q.put(None)
-
-        # Start feeder thread
-        feeder_thread = threading.Thread(target=audio_feeder)
-        feeder_thread.start()
-
-        # Callback function
-        # We need a persistent buffer for the current chunk being played
-        self.current_data = None
-        self.current_pos = 0
-
-        def callback(outdata, frames, time, status):
-            if status:
-                logger.warning(f"Audio status: {status}")
-            
-            if self.stop_event.is_set():
-                raise sd.CallbackStop()
+            finally:
+                ring.eof = True # End of stream
+                self.wake.set()
 
-            filled = 0
-            while filled < frames:
-                if self.current_data is None:
-                    try:
-                        # Get next chunk (non-blocking or short timeout)
-                        item = self.q.get(timeout=0.1)
-                        if item is None:
-                            # End of stream
-                            outdata[filled:].fill(0)
-                            raise sd.CallbackStop()
-                        self.current_data = item
-                        self.current_pos = 0
-                    except queue.Empty:
-                        # Buffer underrun - fill with silence and continue
-                        # logger.warning("Audio buffer underrun")
-                        outdata[filled:].fill(0)
-                        return
-
-                # Copy data to output buffer
-                remaining_frames = frames - filled
-                available_in_chunk = len(self.current_data) - self.current_pos
-                
-                to_copy = min(remaining_frames, available_in_chunk)
-                
-                # Reshape if needed (outdata is usually [frames, channels])
-                chunk_slice = self.current_data[self.current_pos : self.current_pos + to_copy]
-                outdata[filled : filled + to_copy, 0] = chunk_slice
-                
-                self.current_pos += to_copy
-                filled += to_copy
-                
-                if self.current_pos >= len(self.current_data):
-                    self.current_data = None
+        with self.lock:
+            self._release_program()
+            ring.reset()
+            self.stop_event.clear()
+            self.wake.clear()
+            feeder_thread = threading.Thread(target=audio_feeder)
+            feeder_thread.start()
+            self.program = program
+            running = self._ensure_running()
 
         try:
-            with sd.OutputStream(samplerate=sample_rate, channels=1, dtype='int16', callback=callback):
-                # Wait for stream to finish or stop event
-                while feeder_thread.is_alive() or not self.q.empty() or self.current_data is not None:
-                    if self.stop_event.is_set():
-                        break
-                    sd.sleep(100) # Check every 100ms
-                    
-        except Exception as e:
-            logger.error(f"Error starting audio stream: {e}")
+            # Wait for the program to finish or stop event
+            while running and not program.done and not self.stop_event.is_set():
+                self.wake.wait()
+                self.wake.clear()
+                if program.on_first_audio and program.first_audio_time is not None:
+                    program.on_first_audio(program.first_audio_time)
+                    program.on_first_audio = None
+                stream = self.current_stream
+                if stream is None or not stream.active:
+                    break # Device went away or player closed
+
+            # Very short audio may finish before the loop notices it started
+            if program.on_first_audio and program.first_audio_time is not None:
+                program.on_first_audio(program.first_audio_time)
         finally:
-            self.stop_event.set() # Ensure feeder stops
+            finished_feeding.set() # Ensure feeder stops
             feeder_thread.join(timeout=1.0)
+            with self.lock:
+                if self.program is program:
+                    self._release_program()
+
+        self.underruns += program.underruns
+        metrics.increment("audio.programs")
+        if program.underruns:
+            metrics.increment("audio.underruns", program.underruns)
+            logger.warning(f"Audio buffer underran {program.underruns} times")
 
-    def play(self, audio_data: bytes, sample_rate: int = 24000):
+    def play(self, audio_data: bytes, sample_rate: int = SAMPLE_RATE):
         """Legacy play method wrapper."""
         self.play_stream([audio_data], sample_rate)
 
-    def stop(self):
-        """Stops current playback."""
+    def play_cue(self, audio_data: bytes):
+        """
+        Overlays a short sound (e.g. the "processing" cue) on whatever is
+        playing. Returns immediately.
+        """
+        cue = np.frombuffer(audio_data, dtype=np.int16, count=len(audio_data) // 2)
+        # Cues follow the volume setting but not the speed
+        cue = AudioProcessor(volume=config.audio_volume).process(cue)
+        with self.lock:
+            self.cue_pos = 0
+            self.cue = cue
+            self._ensure_running()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "buffered_samples": self.ring.available(),
+        }
+
+    def stop_program(self):
+        """Stops the current program but lets a cue finish (switching or cancelling speech)."""
         self.stop_event.set()
+        self.wake.set()
+
+    def stop(self):
+        """Stops current playback, including any cue (the user asked for silence)."""
+        self.cue = None
+        self.stop_program()
+
+    def close(self):
+        """Stops playback and releases the output device."""
+        self.stop()
+        with self.lock:
+            self._release_program()
+            if self.current_stream is not None:
+                self.current_stream.close()
+                self.current_stream = None
 
-audio_player = AudioPlayer()
+__getattr__ = lazy_singletons(__name__, {"audio_player": AudioPlayer})
@@ -0,0 +1,141 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from echoclip.config import config
+from echoclip.metrics import metrics
+from echoclip.logger import logger
+from echoclip.lazy import lazy_singletons
+from echoclip.persistence import atomic_write
+
+CACHE_DIR = Path.home() / ".local/share/echoclip/cache"
+
+class AudioCache:
+    """
+    Content-addressed on-disk cache of synthesized PCM audio.
+
+    Entries are keyed by (model_name, voice_id, normalized text) and evicted
+    in least-recently-used order once the configured size cap is exceeded.
+    """
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split())
+
+    def make_key(self, text: str, model_name: Optional[str] = None, voice_id: Optional[str] = None) -> str:
+        model_name = model_name or config.model_name
+        voice_id = voice_id or config.voice_id
+        payload = "\0".join([model_name, voice_id, self.normalize(text)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.pcm"
+
+    def _load_index(self):
+        """Scans the cache directory once, ordering entries by last access (mtime)."""
+        if self._index is not None:
+            return
+
+        entries = []
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob("*/*.pcm"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path.stem, st.st_size))
+
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(size for _, _, size in entries)
+        self._publish()
+
+    def get(self, text: str, model_name: Optional[str] = None, voice_id: Optional[str] = None) -> Optional[bytes]:
+        if not config.cache_enabled:
+            return None
+
+        key = self.make_key(text, model_name, voice_id)
+        path = self._path(key)
+
+        with self.lock:
+            self._load_index()
+            if key not in self._index:
+                self.misses += 1
+                metrics.increment("cache.misses")
+                return None
+
+            try:
+                data = path.read_bytes()
+                # Touch the file so recency survives restarts
+                os.utime(path, None)
+            except OSError:
+                self._total_bytes -= self._index.pop(key)
+                self.misses += 1
+                metrics.increment("cache.misses")
+                self._publish()
+                return None
+
+            self._index.move_to_end(key)
+            self.hits += 1
+        metrics.increment("cache.hits")
+
+        logger.debug(f"Cache hit for {key[:12]} ({len(data)} bytes)")
+        return data
+
+    def put(self, text: str, data: bytes, model_name: Optional[str] = None, voice_id: Optional[str] = None):
+        if not config.cache_enabled or not data:
+            return
+
+        key = self.make_key(text, model_name, voice_id)
+        path = self._path(key)
+
+        try:
+            atomic_write(path, data)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry: {e}")
+            return
+
+        with self.lock:
+            self._load_index()
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+            self._publish()
+
+    def _evict(self):
+        max_bytes = int(config.cache_max_size_mb * 1024 * 1024)
+        while self._total_bytes > max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            metrics.increment("cache.evicted_bytes", size)
+            logger.debug(f"Evicted cache entry {key[:12]} ({size} bytes)")
+
+    def _publish(self):
+        metrics.set_gauge("cache.entries", len(self._index))
+        metrics.set_gauge("cache.bytes", self._total_bytes)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+            }
+
+__getattr__ = lazy_singletons(__name__, {"audio_cache": AudioCache})
@@ -0,0 +1,143 @@
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from echoclip.config import config
+
+# Sentence boundary: terminal punctuation (optionally followed by closing quotes/brackets) and whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])["\'”’)\]]*\s+')
+
+# Smallest repeated paragraph worth its own chunk(s) for replay
+MIN_DEDUPE_TOKENS = 16
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate: 1 token ~= 4 chars."""
+    return len(text) // 4
+
+def split_sentences(text: str) -> List[Tuple[str, bool]]:
+    """
+    Splits text into sentences.
+    Returns (sentence, starts_paragraph) pairs so chunks can keep line breaks.
+    """
+    units = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        first = True
+        for sentence in SENTENCE_BOUNDARY.split(paragraph):
+            sentence = sentence.strip()
+            if sentence:
+                units.append((sentence, first))
+                first = False
+    return units
+
+def _split_word(word: str, budget: int) -> List[str]:
+    """Last resort for a run with no whitespace (long URLs, CJK text): cuts it every `budget` tokens' worth of characters."""
+    size = max(1, budget * 4)
+    return [word[i:i + size] for i in range(0, len(word), size)]
+
+def _split_long(sentence: str, budget: int) -> List[Tuple[str, bool]]:
+    """
+    Splits a sentence that exceeds the budget at clause boundaries, then at
+    words, then inside words. Returns (piece, joined) pairs; `joined` pieces
+    continue a word cut in the previous one and take no separator.
+    """
+    pieces = []
+    current = ""
+    joined = False  # Whether `current` continues the last piece
+    for clause in re.split(r'(?<=[,;:])\s+', sentence):
+        for word in clause.split():
+            parts = _split_word(word, budget) if estimate_tokens(word) > budget else [word]
+            for position, part in enumerate(parts):
+                separator = "" if position else " "
+                candidate = f"{current}{separator}{part}" if current else part
+                if current and estimate_tokens(candidate) > budget:
+                    pieces.append((current, joined))
+                    current = part
+                    joined = position > 0
+                else:
+                    current = candidate
+        # Prefer cutting at a clause boundary once the piece is reasonably full
+        if current and estimate_tokens(current) > budget // 2:
+            pieces.append((current, joined))
+            current = ""
+            joined = False
+    if current:
+        pieces.append((current, joined))
+    return pieces
+
+def chunk_text(
+    text: str,
+    first_chunk_tokens: Optional[int] = None,
+    max_chunk_tokens: Optional[int] = None,
+    growth: float = 2.0,
+    dedupe: bool = False,
+) -> List[str]:
+    """
+    Splits text into synthesis chunks on sentence boundaries.
+
+    The first chunk is kept small so audio starts quickly; each following
+    chunk's budget grows by `growth` up to `max_chunk_tokens`, so long texts
+    use fewer, larger requests. Short lines are packed together instead of
+    costing a request each.
+
+    With `dedupe`, a paragraph that occurs more than once gets chunks of its
+    own, and later occurrences repeat the first one's chunks verbatim so the
+    pipeline can synthesize them once and replay the audio.
+    """
+    first_chunk_tokens = first_chunk_tokens or config.chunk_first_tokens
+    max_chunk_tokens = max_chunk_tokens or config.chunk_max_tokens
+
+    chunks: List[str] = []
+    budget = min(first_chunk_tokens, max_chunk_tokens)
+    current = ""
+
+    def flush():
+        nonlocal current, budget
+        if current:
+            chunks.append(current)
+            current = ""
+            budget = min(int(budget * growth), max_chunk_tokens)
+
+    def add(sentence: str, starts_paragraph: bool):
+        nonlocal current
+        pieces = [(sentence, False)] if estimate_tokens(sentence) <= budget else _split_long(sentence, budget)
+        for piece, joined in pieces:
+            separator = "" if joined else "\n" if starts_paragraph else " "
+            candidate = f"{current}{separator}{piece}" if current else piece
+            if current and estimate_tokens(candidate) > budget:
+                flush()
+                candidate = piece
+            current = candidate
+            starts_paragraph = False
+            if estimate_tokens(current) >= budget:
+                flush()
+
+    paragraphs: List[List[str]] = []
+    for sentence, starts_paragraph in split_sentences(text):
+        if starts_paragraph:
+            paragraphs.append([])
+        paragraphs[-1].append(sentence)
+
+    keys = [" ".join(" ".join(paragraph).split()) for paragraph in paragraphs]
+    # Short repeats (list markers, "OK") are cheaper packed with their neighbours
+    repeated = {key for key, count in Counter(keys).items() if count > 1 and estimate_tokens(key) >= MIN_DEDUPE_TOKENS} if dedupe else set()
+    seen: Dict[str, List[str]] = {}
+    for key, paragraph in zip(keys, paragraphs):
+        if key not in repeated:
+            for position, sentence in enumerate(paragraph):
+                add(sentence, position == 0)
+            continue
+        flush()
+        if key in seen:
+            for chunk in seen[key]:
+                current = chunk
+                flush()
+            continue
+        start = len(chunks)
+        for position, sentence in enumerate(paragraph):
+            add(sentence, position == 0)
+        flush()
+        seen[key] = chunks[start:]
+    flush()
+    return chunks
@@ -1,130 +1,327 @@
 from google import genai
 from google.genai import types
 from echoclip.config import config
-from echoclip.keys import key_manager
+from echoclip.keys import key_manager, Reservation
+from echoclip.tokens import token_estimator, prompt_tokens
+from echoclip.cache import audio_cache
+from echoclip.metrics import metrics
+from echoclip import errors
+from echoclip.lazy import lazy_singletons
 from echoclip.logger import logger
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Optional
+import asyncio
+import inspect
+import threading
 import time
 
+def _speech_config(voice_id: Optional[str] = None) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        response_modalities=["AUDIO"],
+        speech_config=types.SpeechConfig(
+            voice_config=types.VoiceConfig(
+                prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                    voice_name=voice_id or config.voice_id
+                )
+            )
+        )
+    )
+
+def _extract_audio(response) -> bytes:
+    """Concatenates the inline audio parts of a response (or stream chunk)."""
+    # The response structure depends on the SDK version, assuming standard.
+    # Candidates that finished early (e.g. finish_reason OTHER) have no content
+    if not response.candidates or not response.candidates[0].content or not response.candidates[0].content.parts:
+        return b""
+    audio = b"".join(
+        part.inline_data.data
+        for part in response.candidates[0].content.parts
+        if part.inline_data and part.inline_data.data
+    )
+    metrics.increment("api.bytes_received", len(audio))
+    return audio
+
+def _reconcile(reservation: Reservation, text: str, response):
+    """Calibrates the token estimator and the key's TPM window from the reported usage."""
+    tokens = prompt_tokens(response)
+    if tokens:
+        token_estimator.observe(text, tokens)
+        key_manager.reconcile(reservation, tokens)
+
+def _record_success(reservation: Reservation, text: str, response):
+    """Marks the key healthy and reconciles its usage (`response` may be None if it reported none)."""
+    key_manager.record_success(reservation.key)
+    if response is not None:
+        _reconcile(reservation, text, response)
+
+def _release_orphan(future: asyncio.Future):
+    """Done callback for a reservation made after its requester was cancelled."""
+    if not future.cancelled() and future.exception() is None and future.result() is not None:
+        key_manager.release(future.result())
+
+async def _reserve_off_loop(reserve: Callable[..., Optional[Reservation]], *args, **kwargs) -> Optional[Reservation]:
+    """
+    Runs a KeyManager reservation in a worker thread, since it may wait on
+    the shared store's lock. A reservation that completes after the caller
+    was cancelled is released.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(reserve, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        future.add_done_callback(_release_orphan)
+        raise
+
+def _handle_error(key: str, e: Exception, attempt: int) -> float:
+    """
+    Updates the key's health after a failed request and returns how long to
+    wait before the next attempt. Re-raises errors that retrying can't fix.
+    """
+    kind, retry_after = errors.classify(e)
+    metrics.increment("api.errors")
+    metrics.increment(f"api.errors.{kind}")
+    if kind == errors.DAILY_QUOTA:
+        key_manager.mark_daily_exhausted(key)
+    elif kind == errors.RATE_LIMITED:
+        # The key rests for the server's hint; the retry goes to another key
+        key_manager.mark_cooldown(key, retry_after)
+    elif kind == errors.INVALID_KEY:
+        key_manager.mark_exhausted(key)
+    elif kind == errors.TRANSIENT:
+        key_manager.record_failure(key)
+        return max(retry_after or 0.0, errors.backoff_delay(attempt))
+    else:
+        raise e
+    return 0.0
+
+class _AttemptFailed(Exception):
+    """A request attempt that failed but may be retried after `delay` seconds."""
+    def __init__(self, cause: Exception, delay: float):
+        super().__init__(str(cause))
+        self.cause = cause
+        self.delay = delay
+
+class Hedger:
+    """
+    Decides when a slow request gets a duplicate on another key.
+
+    A request is hedged once it has run longer than the configured percentile
+    of recent latencies per character (scaled to its own text, so long chunks
+    aren't taken for slow ones), only if another key has a free slot right
+    now, and only while hedges stay within `budget` of all requests, so
+    hedging never delays normal traffic for long.
+    """
+    def __init__(self, min_samples: int = 20, history: int = 200):
+        self.min_samples = min_samples
+        self.latencies: Deque[float] = deque(maxlen=history)  # Seconds per character
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def observe(self, elapsed: float, text: str):
+        self.latencies.append(elapsed / max(len(text), 1))
+
+    def delay(self, text: str) -> Optional[float]:
+        """How long to wait before hedging `text`, or None if hedging is off or uncalibrated."""
+        if not config.hedging_enabled or len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * config.hedging_percentile / 100))
+        return ordered[index] * max(len(text), 1)
+
+    def reserve(self, estimated_tokens: int, busy_key: str):
+        """Reserves an immediately usable slot on another key, if the budget allows."""
+        if self.hedges + 1 > config.hedging_budget * self.requests + 1:
+            return None
+        reservation = key_manager.reserve(estimated_tokens, exclude=[busy_key], max_wait=0.05)
+        if reservation is not None:
+            self.hedges += 1
+            metrics.increment("api.hedges")
+        return reservation
+
+class ClientPool:
+    """
+    Lazily created genai.Client instances, one per API key.
+    Clients are shared across worker threads so their HTTP connections are
+    kept alive between requests instead of paying a new TLS handshake each time.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients: Dict[str, genai.Client] = {}
+        self._cold_keys = set()
+
+    def get(self, key: str) -> genai.Client:
+        with self.lock:
+            client = self.clients.get(key)
+            if client is not None:
+                return client
+
+            start = time.monotonic()
+            http_options = {"api_version": "v1beta"}
+            if config.gemini_base_url:
+                http_options["base_url"] = config.gemini_base_url
+            client = genai.Client(api_key=key, http_options=http_options)
+            metrics.observe("api.client_construct", time.monotonic() - start)
+            metrics.increment("api.clients_created")
+            self.clients[key] = client
+            self._cold_keys.add(key)
+            return client
+
+    def invalidate(self, key: str):
+        with self.lock:
+            if self.clients.pop(key, None) is not None:
+                logger.debug(f"Dropped client for key ...{key[-4:]}")
+            self._cold_keys.discard(key)
+
+    def record_latency(self, key: str, elapsed: float, metric: str = "api.latency"):
+        """
+        Records request latency into `metric` and, split by whether the
+        client's connection was fresh, into `metric`.cold / `metric`.warm.
+        """
+        with self.lock:
+            cold = key in self._cold_keys
+            self._cold_keys.discard(key)
+        metrics.observe(metric, elapsed)
+        metrics.observe(f"{metric}.{'cold' if cold else 'warm'}", elapsed)
+        metrics.increment("api.requests")
+        logger.debug(f"Request with key ...{key[-4:]} took {elapsed:.2f}s ({'cold' if cold else 'warm'} client)")
+
 class TTSClient:
     def __init__(self):
-        pass
+        self.pool = ClientPool()
+        key_manager.add_exhausted_listener(self.pool.invalidate)
+        # asyncio variant sharing the same clients, like genai.Client.aio
+        self.aio = AsyncTTSClient(self.pool)
 
-    def generate_speech(self, text: str) -> bytes:
+    def generate_speech(
+        self,
+        text: str,
+        check_cache: bool = True,
+        stop_event: Optional[threading.Event] = None,
+        voice_id: Optional[str] = None,
+    ) -> bytes:
         """
-        Generates speech from text using Gemini TTS.
-        Handles key rotation and retries.
+        Generates speech from text using Gemini TTS, in `voice_id` (default:
+        the configured voice). Handles key rotation and retries.
+        Results are stored in the audio cache; pass check_cache=False when the
+        caller already looked the text up. If stop_event is set while waiting
+        for a rate-limit slot, the slot is released and b"" is returned.
         """
+        if check_cache:
+            cached = audio_cache.get(text, voice_id=voice_id)
+            if cached is not None:
+                return cached
+
         retries = 3
         for attempt in range(retries):
             # 1. Get a valid key
-            # Estimate tokens: 1 token ~= 4 chars. 
-            estimated_tokens = len(text) // 4
-            key = key_manager.get_best_key(estimated_tokens)
+            estimated_tokens = token_estimator.estimate(text)
+            reservation = key_manager.reserve(estimated_tokens)
             
-            if not key:
+            if not reservation:
                 logger.error("No available API keys!")
                 raise Exception("No available API keys")
 
-            # 2. Acquire rate limit lock
-            key_manager.acquire(key, estimated_tokens)
+            # 2. Wait for the reserved slot (outside any KeyManager lock)
+            key = reservation.key
+            if not reservation.wait(stop_event):
+                key_manager.release(reservation)
+                return b""
 
             # 3. Make request
             try:
-                client = genai.Client(api_key=key, http_options={"api_version": "v1beta"})
+                client = self.pool.get(key)
                 
+                start = time.monotonic()
                 response = client.models.generate_content(
                     model=config.model_name,
                     contents=text,
-                    config=types.GenerateContentConfig(
-                        response_modalities=["AUDIO"],
-                        speech_config=types.SpeechConfig(
-                            voice_config=types.VoiceConfig(
-                                prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                    voice_name=config.voice_id
-                                )
-                            )
-                        )
-                    )
+                    config=_speech_config(voice_id)
                 )
+                self.pool.record_latency(key, time.monotonic() - start)
+                key_manager.record_success(key)
+                _reconcile(reservation, text, response)
                 
-                # Extract audio bytes
-                # The response structure depends on the SDK version, assuming standard
-                if response.candidates and response.candidates[0].content.parts:
-                    for part in response.candidates[0].content.parts:
-                        if part.inline_data:
-                            return part.inline_data.data
+                audio = _extract_audio(response)
+                if audio:
+                    audio_cache.put(text, audio, voice_id=voice_id)
+                    return audio
                 
                 logger.warning(f"No audio data in response with key ...{key[-4:]}")
                 return b""
 
             except Exception as e:
                 logger.error(f"Error generating speech with key ...{key[-4:]}: {e}")
-                
-                # Check for 429 or 503
-                if "429" in str(e) or "ResourceExhausted" in str(e):
-                    key_manager.mark_exhausted(key) # Or mark for cooldown?
-                    # For now, mark exhausted if it's a hard limit, or cooldown if it's transient
-                    # Let's assume cooldown for now to be safe, or just let the loop retry
-                    key_manager.mark_cooldown(key, 60)
-                elif "403" in str(e) or "API key not valid" in str(e):
-                    key_manager.mark_exhausted(key)
-                else:
-                    # Other errors, maybe transient
-                    pass
-                
+                delay = _handle_error(key, e, attempt)
+                if delay and attempt < retries - 1:
+                    if stop_event is None:
+                        time.sleep(delay)
+                    elif stop_event.wait(delay):
+                        return b""
                 continue
         
-    def generate_speech_stream(self, text: str):
+    def generate_speech_stream(self, text: str, stop_event: Optional[threading.Event] = None):
         """
         Generates speech stream from text using Gemini TTS.
         Yields audio bytes chunks.
         """
+        cached = audio_cache.get(text)
+        if cached is not None:
+            yield cached
+            return
+
         retries = 3
         for attempt in range(retries):
-            estimated_tokens = len(text) // 4
-            key = key_manager.get_best_key(estimated_tokens)
+            estimated_tokens = token_estimator.estimate(text)
+            reservation = key_manager.reserve(estimated_tokens)
             
-            if not key:
+            if not reservation:
                 logger.error("No available API keys!")
                 raise Exception("No available API keys")
 
-            key_manager.acquire(key, estimated_tokens)
+            key = reservation.key
+            if not reservation.wait(stop_event):
+                key_manager.release(reservation)
+                return
 
             try:
-                client = genai.Client(api_key=key, http_options={"api_version": "v1beta"})
+                client = self.pool.get(key)
                 
+                start = time.monotonic()
                 # Use generate_content_stream
                 # Note: The SDK might return an iterator or async iterator.
                 # Based on standard usage, it's often a sync iterator in sync client.
                 response_stream = client.models.generate_content_stream(
                     model=config.model_name,
                     contents=text,
-                    config=types.GenerateContentConfig(
-                        response_modalities=["AUDIO"],
-                        speech_config=types.SpeechConfig(
-                            voice_config=types.VoiceConfig(
-                                prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                    voice_name=config.voice_id
-                                )
-                            )
-                        )
-                    )
+                    config=_speech_config()
                 )
                 
+                received = []
+                usage_chunk = None
+                first_chunk = True
                 for chunk in response_stream:
-                    if chunk.candidates and chunk.candidates[0].content.parts:
-                        for part in chunk.candidates[0].content.parts:
-                            if part.inline_data:
-                                yield part.inline_data.data
+                    if first_chunk:
+                        # Time to first chunk
+                        self.pool.record_latency(key, time.monotonic() - start, "api.first_chunk_latency")
+                        first_chunk = False
+                    if prompt_tokens(chunk):
+                        usage_chunk = chunk
+                    audio = _extract_audio(chunk)
+                    if audio:
+                        received.append(audio)
+                        yield audio
                 
+                key_manager.record_success(key)
+                if usage_chunk is not None:
+                    _reconcile(reservation, text, usage_chunk)
+                # Only complete streams are cached
+                audio_cache.put(text, b"".join(received))
                 return # Success
 
             except Exception as e:
                 logger.error(f"Error generating speech stream with key ...{key[-4:]}: {e}")
-                if "429" in str(e) or "ResourceExhausted" in str(e):
-                    key_manager.mark_cooldown(key, 60)
-                elif "403" in str(e) or "API key not valid" in str(e):
-                    key_manager.mark_exhausted(key)
+                delay = _handle_error(key, e, attempt)
                 
                 # If we yielded partial data, we can't easily retry the whole thing seamlessly 
                 # without the user hearing a glitch. But for MVP, let's just retry or stop.
@@ -133,8 +330,198 @@ class TTSClient:
                 # But if it fails at the start, we retry.
                 # Complex retry logic for streams is out of scope for simple MVP, 
                 # but we can try to catch start errors.
-                pass
+                if delay and attempt < retries - 1:
+                    if stop_event is None:
+                        time.sleep(delay)
+                    elif stop_event.wait(delay):
+                        return
         
         raise Exception("Failed to generate speech stream after retries")
 
-tts_client = TTSClient()
+class AsyncTTSClient:
+    """
+    asyncio variant of TTSClient built on the SDK's async client.
+    Waiting for a rate-limit slot is an asyncio sleep, so cancelling the
+    calling task releases the reservation instead of spending it.
+    """
+    def __init__(self, pool: ClientPool):
+        self.pool = pool
+        self.hedger = Hedger()
+
+    async def _reserve(self, text: str):
+        estimated_tokens = token_estimator.estimate(text)
+        reservation = await _reserve_off_loop(key_manager.reserve, estimated_tokens)
+        if not reservation:
+            logger.error("No available API keys!")
+            raise Exception("No available API keys")
+
+        delay = max(0.0, reservation.eta - time.time())
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            key_manager.release(reservation)
+            raise
+        reservation.record_wait(delay)
+        return reservation
+
+    async def _request(self, text: str, reservation, attempt: int, on_request: Optional[Callable[[str], None]] = None) -> bytes:
+        """One generate_content call on the reserved key. Failures raise _AttemptFailed."""
+        key = reservation.key
+        if on_request:
+            on_request(key)
+        try:
+            client = self.pool.get(key)
+
+            start = time.monotonic()
+            response = await client.aio.models.generate_content(
+                model=config.model_name,
+                contents=text,
+                config=_speech_config()
+            )
+            elapsed = time.monotonic() - start
+            self.pool.record_latency(key, elapsed)
+            self.hedger.observe(elapsed, text)
+            await asyncio.to_thread(_record_success, reservation, text, response)
+
+            audio = _extract_audio(response)
+            if not audio:
+                logger.warning(f"No audio data in response with key ...{key[-4:]}")
+            return audio
+
+        except Exception as e:
+            logger.error(f"Error generating speech with key ...{key[-4:]}: {e}")
+            raise _AttemptFailed(e, _handle_error(key, e, attempt)) from e
+
+    async def _hedge(self, text: str, reservation, attempt: int, on_request: Optional[Callable[[str], None]]) -> bytes:
+        """Sends the duplicate once its slot opens (reserve() may hand out one slightly ahead)."""
+        try:
+            await asyncio.sleep(max(0.0, reservation.eta - time.time()))
+        except asyncio.CancelledError:
+            key_manager.release(reservation)
+            raise
+        return await self._request(text, reservation, attempt, on_request)
+
+    async def _hedged_request(self, text: str, reservation, attempt: int, on_request: Optional[Callable[[str], None]] = None) -> bytes:
+        """
+        Runs the request; if it outlives the hedging delay, races a duplicate
+        on another key and returns whichever succeeds first, cancelling the other.
+        """
+        self.hedger.requests += 1
+        primary = asyncio.ensure_future(self._request(text, reservation, attempt, on_request))
+        delay = self.hedger.delay(text)
+        if delay is None:
+            return await primary
+
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            hedge_reservation = await _reserve_off_loop(self.hedger.reserve, reservation.tokens, reservation.key)
+            if hedge_reservation is None:
+                return await primary
+            logger.info(f"Hedging slow request on key ...{hedge_reservation.key[-4:]} after {delay:.2f}s")
+            hedge = asyncio.ensure_future(self._hedge(text, hedge_reservation, attempt, on_request))
+
+            pending = {primary, hedge}
+            failure = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedger.wins += 1
+                            metrics.increment("api.hedge_wins")
+                        return task.result()
+                    failure = failure or task.exception()
+            raise failure
+        finally:
+            # Cancel the loser (or both, if we were cancelled)
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def generate_speech(self, text: str, check_cache: bool = True, on_request: Optional[Callable[[str], None]] = None) -> bytes:
+        """
+        Generates speech from text. Handles key rotation, retries and caching;
+        slow requests may be hedged on a second key. on_request is called with
+        the key of every request sent (retries and hedges included).
+        """
+        if check_cache:
+            cached = await asyncio.to_thread(audio_cache.get, text)
+            if cached is not None:
+                return cached
+
+        retries = 3
+        for attempt in range(retries):
+            reservation = await self._reserve(text)
+            try:
+                audio = await self._hedged_request(text, reservation, attempt, on_request)
+            except _AttemptFailed as failed:
+                if failed.delay and attempt < retries - 1:
+                    await asyncio.sleep(failed.delay)
+                continue
+
+            if audio:
+                await asyncio.to_thread(audio_cache.put, text, audio)
+            return audio
+
+        raise Exception("Failed to generate speech after retries")
+
+    async def generate_speech_stream(self, text: str) -> AsyncIterator[bytes]:
+        """Generates speech from text, yielding audio bytes chunks as they arrive."""
+        cached = await asyncio.to_thread(audio_cache.get, text)
+        if cached is not None:
+            yield cached
+            return
+
+        retries = 3
+        for attempt in range(retries):
+            reservation = await self._reserve(text)
+            key = reservation.key
+            received = []
+            try:
+                client = self.pool.get(key)
+
+                start = time.monotonic()
+                response_stream = client.aio.models.generate_content_stream(
+                    model=config.model_name,
+                    contents=text,
+                    config=_speech_config()
+                )
+                # Older SDKs return the async iterator directly, newer ones a coroutine
+                if inspect.isawaitable(response_stream):
+                    response_stream = await response_stream
+
+                usage_chunk = None
+                first_chunk = True
+                async for chunk in response_stream:
+                    if first_chunk:
+                        # Time to first chunk
+                        self.pool.record_latency(key, time.monotonic() - start, "api.first_chunk_latency")
+                        first_chunk = False
+                    if prompt_tokens(chunk):
+                        usage_chunk = chunk
+                    audio = _extract_audio(chunk)
+                    if audio:
+                        received.append(audio)
+                        yield audio
+
+                await asyncio.to_thread(_record_success, reservation, text, usage_chunk)
+                # Only complete streams are cached
+                await asyncio.to_thread(audio_cache.put, text, b"".join(received))
+                return # Success
+
+            except Exception as e:
+                logger.error(f"Error generating speech stream with key ...{key[-4:]}: {e}")
+                delay = _handle_error(key, e, attempt)
+                # Retrying after audio was yielded would repeat it
+                if received:
+                    raise
+                if delay and attempt < retries - 1:
+                    await asyncio.sleep(delay)
+
+        raise Exception("Failed to generate speech stream after retries")
+
+__getattr__ = lazy_singletons(__name__, {"tts_client": TTSClient})
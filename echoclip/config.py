@@ -22,14 +22,49 @@ DEFAULT_CONFIG = {
     },
     "rate_limits": {
         "rpm": 10,
-        "tpm": 250000
+        "tpm": 250000,
+        "rpd": 250
+    },
+    "cache": {
+        "enabled": True,
+        "max_size_mb": 200
+    },
+    "chunking": {
+        "first_chunk_tokens": 40,
+        "max_chunk_tokens": 400
+    },
+    "hedging": {
+        "enabled": False,
+        "percentile": 95,
+        "budget": 0.1
+    },
+    "coordination": {
+        "enabled": True
+    },
+    "speculation": {
+        "enabled": False,
+        "max_chars": 2000,
+        "max_per_hour": 20,
+        "poll_interval": 0.5
+    },
+    "normalization": {
+        "enabled": True,
+        "markdown": True,
+        "urls": "shorten",
+        "code": "skip",
+        "dedupe": True
     }
 }
 
+# [audio] settings are clamped to what the DSP stage handles
+MIN_AUDIO_SPEED = 0.25
+MAX_AUDIO_SPEED = 4.0
+MAX_AUDIO_VOLUME = 4.0
+
 # Rate Limits (as of Nov 2025)
 MODEL_RATE_LIMITS = {
-    "gemini-2.5-flash": {"rpm": 10, "tpm": 250000},
-    "gemini-2.5-flash-preview-tts": {"rpm": 3, "tpm": 10000}, # Special low limit for TTS preview
+    "gemini-2.5-flash": {"rpm": 10, "tpm": 250000, "rpd": 250},
+    "gemini-2.5-flash-preview-tts": {"rpm": 3, "tpm": 10000, "rpd": 15}, # Special low limit for TTS preview
 }
 
 class Config:
@@ -65,18 +100,112 @@ class Config:
     def model_name(self) -> str:
         return self._config["gemini"].get("model_name", "gemini-2.5-flash")
 
+    @property
+    def gemini_base_url(self) -> Optional[str]:
+        """Overrides the API endpoint, e.g. to point at benchmarks/fake_gemini.py."""
+        return self._config["gemini"].get("base_url")
+
     @property
     def voice_id(self) -> str:
         return self._config["gemini"].get("voice_id", "Aoede")
 
+    @property
+    def audio_speed(self) -> float:
+        speed = float(self._config.get("audio", {}).get("speed", 1.0))
+        return min(max(speed, MIN_AUDIO_SPEED), MAX_AUDIO_SPEED)
+
+    @property
+    def audio_volume(self) -> float:
+        volume = float(self._config.get("audio", {}).get("volume", 1.0))
+        return min(max(volume, 0.0), MAX_AUDIO_VOLUME)
+
     @property
     def hotkey(self) -> str:
         return self._config["system"].get("hotkey", "F7")
 
+    @property
+    def cache_enabled(self) -> bool:
+        return self._config.get("cache", {}).get("enabled", True)
+
+    @property
+    def cache_max_size_mb(self) -> float:
+        return self._config.get("cache", {}).get("max_size_mb", 200)
+
+    @property
+    def chunk_first_tokens(self) -> int:
+        return self._config.get("chunking", {}).get("first_chunk_tokens", 40)
+
+    @property
+    def chunk_max_tokens(self) -> int:
+        return self._config.get("chunking", {}).get("max_chunk_tokens", 400)
+
+    @property
+    def hedging_enabled(self) -> bool:
+        return self._config.get("hedging", {}).get("enabled", False)
+
+    @property
+    def hedging_percentile(self) -> float:
+        return self._config.get("hedging", {}).get("percentile", 95)
+
+    @property
+    def hedging_budget(self) -> float:
+        return self._config.get("hedging", {}).get("budget", 0.1)
+
+    @property
+    def coordination_enabled(self) -> bool:
+        return self._config.get("coordination", {}).get("enabled", True)
+
+    @property
+    def coordination_path(self) -> Optional[Path]:
+        """Shared key state file; point several users at one path to share their limits."""
+        path = self._config.get("coordination", {}).get("path")
+        return Path(path).expanduser() if path else None
+
+    @property
+    def speculation_enabled(self) -> bool:
+        return self._config.get("speculation", {}).get("enabled", False)
+
+    @property
+    def speculation_max_chars(self) -> int:
+        return self._config.get("speculation", {}).get("max_chars", 2000)
+
+    @property
+    def speculation_max_per_hour(self) -> int:
+        return self._config.get("speculation", {}).get("max_per_hour", 20)
+
+    @property
+    def speculation_poll_interval(self) -> float:
+        return self._config.get("speculation", {}).get("poll_interval", 0.5)
+
+    @property
+    def normalize_enabled(self) -> bool:
+        return self._config.get("normalization", {}).get("enabled", True)
+
+    @property
+    def normalize_markdown(self) -> bool:
+        return self._config.get("normalization", {}).get("markdown", True)
+
+    @property
+    def normalize_urls(self) -> str:
+        return self._config.get("normalization", {}).get("urls", "shorten")
+
+    @property
+    def normalize_code(self) -> str:
+        return self._config.get("normalization", {}).get("code", "skip")
+
+    @property
+    def normalize_dedupe(self) -> bool:
+        return self._config.get("normalization", {}).get("dedupe", True)
+
     @property
     def rate_limits(self) -> Dict[str, int]:
         if "rate_limits" in self._config:
-            return self._config["rate_limits"]
+            limits = self._config["rate_limits"]
+            # Scheduling divides by these; a key with no capacity shouldn't be configured at all
+            for name in ("rpm", "tpm"):
+                if not limits.get(name, 0) > 0:
+                    raise ValueError(f"rate_limits.{name} must be a positive number in {CONFIG_FILE}, got {limits.get(name)!r}")
+            return limits
         
         model = self.model_name
         if model in MODEL_RATE_LIMITS:
@@ -84,4 +213,9 @@ class Config:
             
         return DEFAULT_CONFIG["rate_limits"]
 
+    @property
+    def rpd_limit(self) -> int:
+        """Requests per day per key; 0 means no daily limit."""
+        return self.rate_limits.get("rpd", 0)
+
 config = Config()
@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from echoclip.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # Not on POSIX: each process keeps its own limits
+    fcntl = None
+
+_RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR")
+# tmpfs when available: every reservation writes here, and it needn't survive a reboot
+DEFAULT_STORE = (Path(_RUNTIME_DIR) if _RUNTIME_DIR else Path.home() / ".local/share/echoclip") / "echoclip-keys.json"
+
+def key_id(key: str) -> str:
+    """How a key is named in the shared store, so the store never holds the key itself."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+class SharedKeyStore:
+    """
+    Per-key rate-limit state shared by every EchoClip process on the host.
+
+    A small JSON file, read and rewritten in place under an exclusive
+    flock(), so a process always schedules against the reservations of all
+    the others. The file is only parsed again when another process changed
+    it since this one last looked. If the file can't be used, `failed` is
+    set and the caller falls back to tracking limits on its own.
+    """
+    def __init__(self, path: Path = DEFAULT_STORE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.fd: Optional[int] = None
+        self.raw = b""
+        self.data: Dict[str, Any] = {"keys": {}}
+        self.failed = False
+
+    def _open(self) -> int:
+        if self.fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Honors the umask: a store shared by several users needs a group-writable one
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        return self.fd
+
+    def _fail(self, error: OSError):
+        logger.warning(f"Shared key state {self.path} is unusable ({error}); rate limits are tracked per process")
+        self.failed = True
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _read(self, fd: int) -> bytes:
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(fd, 65536, offset)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+            offset += len(chunk)
+
+    @contextmanager
+    def locked(self) -> Iterator[Optional[Dict[str, Dict]]]:
+        """
+        Holds the store for a read-modify-write. Yields the per-key entries if
+        another process changed them since our last look, else None (our
+        copy is current). Call write() inside the block to publish updates.
+        """
+        with self.lock:
+            try:
+                fd = self._open()
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except OSError as e:
+                self._fail(e)
+                yield None
+                return
+            try:
+                try:
+                    raw = self._read(fd)
+                except OSError as e:
+                    self._fail(e)
+                    raw = self.raw
+                changed = None
+                if raw != self.raw:
+                    self.raw = raw
+                    try:
+                        self.data = json.loads(raw) if raw else {"keys": {}}
+                    except ValueError:
+                        logger.warning(f"Ignoring corrupt shared key state in {self.path}")
+                        self.data = {"keys": {}}
+                    changed = self.data.setdefault("keys", {})
+                yield changed
+            finally:
+                if self.fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def write(self, keys: Dict[str, Dict]):
+        """Publishes the entries in `keys` (by key_id), keeping every other key's. Call within locked()."""
+        if self.failed:
+            return
+        self.data["keys"].update(keys)
+        raw = json.dumps(self.data, separators=(",", ":")).encode("utf-8")
+        if raw == self.raw:
+            return
+        try:
+            os.pwrite(self.fd, raw, 0)
+            os.ftruncate(self.fd, len(raw))
+        except OSError as e:
+            self._fail(e)
+            return
+        self.raw = raw
+
+def open_store(path: Optional[Path] = None) -> Optional[SharedKeyStore]:
+    """The host's shared store, or None if this platform has no flock() or the file can't be opened."""
+    if fcntl is None:
+        logger.debug("fcntl unavailable; rate limits are not coordinated across processes")
+        return None
+    store = SharedKeyStore(path or DEFAULT_STORE)
+    try:
+        store._open()
+    except OSError as e:
+        store._fail(e)
+        return None
+    return store
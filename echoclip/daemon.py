@@ -0,0 +1,222 @@
+import os
+import json
+import heapq
+import atexit
+import itertools
+import threading
+import socketserver
+import concurrent.futures
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from echoclip.pipeline import speech_pipeline
+from echoclip.audio import audio_player
+from echoclip.ipc import SOCKET_PATH, encode, is_listening
+from echoclip.lazy import lazy_singletons
+from echoclip.logger import logger
+
+class Job:
+    """A text to speak. `future` resolves when it has been spoken, fails or is dropped (cancelled)."""
+    def __init__(self, job_id: int, text: str, priority: int, on_first_audio: Optional[Callable[[float], None]]):
+        self.id = job_id
+        self.text = text
+        self.priority = priority
+        self.on_first_audio = on_first_audio
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def describe(self) -> Dict[str, Any]:
+        return {"job": self.id, "priority": self.priority, "text": self.text[:60]}
+
+class SpeechQueue:
+    """
+    Speaks jobs one at a time through speech_pipeline, highest priority
+    first and in submission order within a priority.
+
+    An interrupting job stops the one playing and starts right away (the
+    stopped job is dropped, as a new hotkey press always did); queued jobs
+    resume after it. stop() silences everything.
+    """
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.pending: List[Tuple[int, int, Job]] = []  # Heap of (-priority, id, job)
+        self.next: Optional[Job] = None  # Interrupting job, ahead of the heap
+        self.current: Optional[Job] = None
+        self.playing: Optional[concurrent.futures.Future] = None
+        self.ids = itertools.count(1)
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        text: str,
+        priority: int = 0,
+        interrupt: bool = False,
+        on_first_audio: Optional[Callable[[float], None]] = None,
+    ) -> Job:
+        with self.lock:
+            job = Job(next(self.ids), text, priority, on_first_audio)
+            if interrupt:
+                if self.next is not None:
+                    self.next.future.cancel()
+                self.next = job
+                if self.playing is not None:
+                    self.playing.cancel()
+            else:
+                heapq.heappush(self.pending, (-priority, job.id, job))
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="echoclip-queue", daemon=True)
+                self.thread.start()
+            self.lock.notify()
+        return job
+
+    def ahead_of(self, job: Job) -> int:
+        """How many jobs will be spoken before `job`."""
+        with self.lock:
+            if job is self.next or job is self.current:
+                return 0
+            entry = (-job.priority, job.id)
+            ahead = sum(1 for priority, job_id, _ in self.pending if (priority, job_id) < entry)
+            return ahead + (self.next is not None) + (self.current is not None)
+
+    def stop(self) -> int:
+        """Stops the job playing and drops every queued one. Returns how many were dropped."""
+        with self.lock:
+            dropped = [job for _, _, job in self.pending]
+            self.pending.clear()
+            if self.next is not None:
+                dropped.append(self.next)
+                self.next = None
+            for job in dropped:
+                job.future.cancel()
+            if self.playing is not None:
+                self.playing.cancel()
+        audio_player.stop()
+        return len(dropped)
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            queued = ([self.next] if self.next is not None else []) + [job for _, _, job in sorted(self.pending)]
+            return {
+                "current": self.current.describe() if self.current is not None else None,
+                "queued": [job.describe() for job in queued],
+            }
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while self.next is None and not self.pending:
+                    self.lock.wait()
+                if self.next is not None:
+                    job, self.next = self.next, None
+                else:
+                    job = heapq.heappop(self.pending)[2]
+                if job.future.cancelled():
+                    continue
+                self.current = job
+                self.playing = playing = speech_pipeline.speak(job.text, on_first_audio=job.on_first_audio)
+
+            try:
+                playing.result()
+            except concurrent.futures.CancelledError:
+                job.future.cancel()
+            except Exception as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(None)
+            finally:
+                with self.lock:
+                    self.current = None
+                    self.playing = None
+
+__getattr__ = lazy_singletons(__name__, {"speech_queue": SpeechQueue})
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One request per connection, see echoclip.ipc."""
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return  # A liveness probe (ipc.is_listening)
+
+        try:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+            op = message.get("op") if isinstance(message, dict) else None
+            if op is None:
+                self._reply({"ok": False, "error": "Invalid request"})
+            elif op == "speak":
+                self._speak(message)
+            elif op == "stop":
+                self._reply({"ok": True, "dropped": self.server.queue.stop()})
+            elif op == "status":
+                self._reply({"ok": True, **self.server.queue.status()})
+            else:
+                self._reply({"ok": False, "error": f"Unknown op: {op}"})
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client went away; its job (if any) still plays
+
+    def _reply(self, message: Dict[str, Any]):
+        self.wfile.write(encode(message))
+        self.wfile.flush()
+
+    def _speak(self, message: Dict[str, Any]):
+        text = message.get("text")
+        priority = message.get("priority", 0)
+        if not isinstance(text, str) or not text.strip():
+            self._reply({"ok": False, "error": "Nothing to speak"})
+            return
+        if not isinstance(priority, int):
+            self._reply({"ok": False, "error": "priority must be an integer"})
+            return
+
+        job = self.server.queue.submit(text, priority=priority, interrupt=bool(message.get("interrupt")))
+        logger.info(f"Socket job {job.id} (priority {priority}): {text[:50]}...")
+        self._reply({"ok": True, "job": job.id, "ahead": self.server.queue.ahead_of(job)})
+        if not message.get("wait"):
+            return
+
+        concurrent.futures.wait([job.future])
+        if job.future.cancelled():
+            self._reply({"ok": True, "job": job.id, "state": "cancelled"})
+        elif job.future.exception() is not None:
+            self._reply({"ok": False, "job": job.id, "state": "failed", "error": str(job.future.exception())})
+        else:
+            self._reply({"ok": True, "job": job.id, "state": "done"})
+
+class DaemonServer:
+    """Serves the speak API for `queue` on a Unix socket from a background thread."""
+    def __init__(self, queue: SpeechQueue, path: Path = SOCKET_PATH):
+        self.queue = queue
+        self.path = path
+        self.server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def start(self):
+        """Starts listening. Raises RuntimeError if another instance already is."""
+        if self.path.exists():
+            if is_listening(self.path):
+                raise RuntimeError(f"EchoClip is already running (listening on {self.path})")
+            self.path.unlink()  # Left over from a crash
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Only this user may connect
+        umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(str(self.path), _Handler)
+        finally:
+            os.umask(umask)
+        self.server.daemon_threads = True
+        self.server.queue = self.queue
+        threading.Thread(target=self.server.serve_forever, name="echoclip-socket", daemon=True).start()
+        atexit.register(self.stop)
+        logger.info(f"Listening for speak requests on {self.path}")
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
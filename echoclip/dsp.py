@@ -0,0 +1,102 @@
+import numpy as np
+
+class TimeStretcher:
+    """
+    Streaming WSOLA (waveform-similarity overlap-add) time-stretcher.
+
+    Changes playback speed without changing pitch. Input is consumed in
+    arbitrary blocks; windowed frames are taken every `speed * hop` input
+    samples, nudged within a small tolerance to the position that best
+    continues the previous frame, and overlap-added every `hop` output samples.
+    Only a few frames of input are kept between calls.
+    """
+    def __init__(self, speed: float, sample_rate: int, frame_ms: float = 30.0):
+        if not speed > 0:
+            # process() would never advance through the input
+            raise ValueError(f"speed must be positive, got {speed}")
+        self.speed = speed
+        self.frame = int(sample_rate * frame_ms / 1000) // 2 * 2
+        self.hop = self.frame // 2
+        self.analysis_hop = max(self.hop * speed, 1.0)
+        self.tolerance = self.hop // 2
+        n = np.arange(self.frame)
+        # Periodic Hann: windows at 50% overlap sum to exactly 1
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * n / self.frame)).astype(np.float32)
+        self.input = np.zeros(self.tolerance, dtype=np.float32)
+        self.pos = float(self.tolerance)
+        self.prev = -1
+        self.overlap = np.zeros(self.frame, dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        self.input = np.concatenate((self.input, block.astype(np.float32)))
+        frame, hop, tolerance = self.frame, self.hop, self.tolerance
+        outputs = []
+
+        while True:
+            nominal = int(round(self.pos))
+            if nominal + tolerance + frame > len(self.input):
+                break
+
+            if self.prev < 0:
+                start = nominal
+            else:
+                # Pick the candidate that best matches the natural continuation
+                # of the previous frame over the overlapping half
+                template = self.input[self.prev + hop:self.prev + 2 * hop]
+                region = self.input[nominal - tolerance:nominal + tolerance + hop]
+                corr = np.correlate(region, template, mode="valid")
+                start = nominal - tolerance + int(np.argmax(corr))
+
+            self.overlap += self.input[start:start + frame] * self.window
+            outputs.append(self.overlap[:hop].copy())
+            self.overlap[:-hop] = self.overlap[hop:]
+            self.overlap[-hop:] = 0
+            self.prev = start
+            self.pos += self.analysis_hop
+
+        # Drop input no future frame or template can reach
+        keep_from = int(self.pos) - tolerance
+        if self.prev >= 0:
+            keep_from = min(keep_from, self.prev + hop)
+        if keep_from > 0:
+            self.input = self.input[keep_from:]
+            self.pos -= keep_from
+            self.prev -= keep_from
+
+        if not outputs:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(outputs)
+
+    def flush(self) -> np.ndarray:
+        """Processes the remaining input (padded with silence) and returns the tail."""
+        tail = self.process(np.zeros(self.frame + 2 * self.tolerance, dtype=np.float32))
+        return np.concatenate((tail, self.overlap[:self.hop]))
+
+class AudioProcessor:
+    """
+    Streaming DSP stage between the feeder and the output: pitch-preserving
+    time-stretch followed by gain. At speed 1.0 and volume 1.0 blocks pass
+    through untouched.
+    """
+    def __init__(self, speed: float = 1.0, volume: float = 1.0, sample_rate: int = 24000):
+        self.volume = volume
+        self.stretcher = TimeStretcher(speed, sample_rate) if abs(speed - 1.0) > 0.01 else None
+
+    def _finish(self, samples: np.ndarray) -> np.ndarray:
+        if self.volume != 1.0:
+            samples = samples * np.float32(self.volume)
+        np.clip(samples, -32768, 32767, out=samples)
+        return samples.astype(np.int16)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Processes one block of int16 samples; returns int16 samples (possibly fewer or more)."""
+        if self.stretcher is None:
+            if self.volume == 1.0:
+                return samples
+            return self._finish(samples.astype(np.float32))
+        return self._finish(self.stretcher.process(samples))
+
+    def flush(self) -> np.ndarray:
+        if self.stretcher is None:
+            return np.zeros(0, dtype=np.int16)
+        return self._finish(self.stretcher.flush())
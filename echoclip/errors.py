@@ -0,0 +1,87 @@
+import re
+import ssl
+import random
+import socket
+import asyncio
+from typing import Optional, Tuple
+from google.genai import errors as genai_errors
+
+# What a failed request says about the key and whether to try again
+RATE_LIMITED = "rate_limited"  # 429: key is fine, but must rest (for retry_after if given)
+DAILY_QUOTA = "daily_quota"    # 429 on a per-day quota: key is done until the reset
+INVALID_KEY = "invalid_key"    # 400/401/403 on the key itself: never use it again
+TRANSIENT = "transient"        # 5xx, timeouts, connection errors: retry after a backoff
+FATAL = "fatal"                # Anything else (e.g. a malformed request): retrying won't help
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)s\s*$")
+
+def _parse_duration(value) -> Optional[float]:
+    """Parses a protobuf Duration string such as "12s" or "0.5s"."""
+    match = _DURATION.match(str(value))
+    return float(match.group(1)) if match else None
+
+def _error_details(e: genai_errors.APIError) -> list:
+    body = e.details
+    if isinstance(body, dict):
+        body = body.get("error", body)
+        details = body.get("details")
+        if isinstance(details, list):
+            return details
+    return []
+
+def _retry_after(e: genai_errors.APIError) -> Optional[float]:
+    """The server's retry hint: google.rpc.RetryInfo, or a Retry-After header."""
+    for detail in _error_details(e):
+        if isinstance(detail, dict) and detail.get("@type", "").endswith("google.rpc.RetryInfo"):
+            delay = _parse_duration(detail.get("retryDelay", ""))
+            if delay is not None:
+                return delay
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if headers:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return None
+
+def _is_daily_quota(e: Exception) -> bool:
+    for detail in _error_details(e) if isinstance(e, genai_errors.APIError) else []:
+        if isinstance(detail, dict) and detail.get("@type", "").endswith("google.rpc.QuotaFailure"):
+            for violation in detail.get("violations", []):
+                if "PerDay" in str(violation.get("quotaId", "")):
+                    return True
+    return "PerDay" in str(e)
+
+def classify(e: Exception) -> Tuple[str, Optional[float]]:
+    """Returns (kind, retry_after seconds or None) for an exception raised by a request."""
+    if isinstance(e, genai_errors.APIError):
+        code = e.code or 0
+        message = str(e)
+        if code == 429:
+            if _is_daily_quota(e):
+                return DAILY_QUOTA, None
+            return RATE_LIMITED, _retry_after(e)
+        if code in (401, 403) or "API_KEY_INVALID" in message or "API key not valid" in message:
+            return INVALID_KEY, None
+        if code == 408 or code >= 500:
+            return TRANSIENT, _retry_after(e)
+        return FATAL, None
+
+    if isinstance(e, (ConnectionError, TimeoutError, asyncio.TimeoutError, ssl.SSLError, socket.gaierror)):
+        return TRANSIENT, None
+    # httpx transport errors (the SDK's HTTP client) without importing httpx here
+    if type(e).__module__.startswith(("httpx", "httpcore", "aiohttp")):
+        return TRANSIENT, None
+
+    # Unknown exception types: fall back to what the message says
+    message = str(e)
+    if "429" in message or "ResourceExhausted" in message or "RESOURCE_EXHAUSTED" in message:
+        return (DAILY_QUOTA, None) if "PerDay" in message else (RATE_LIMITED, None)
+    if "403" in message or "API key not valid" in message:
+        return INVALID_KEY, None
+    # Not from the API or the network (e.g. a bug handling the response): says nothing about the key
+    return FATAL, None
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
@@ -0,0 +1,41 @@
+import os
+import json
+import socket
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+# Standard library only: `echoclip speak` imports this without loading the app.
+_RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR")
+SOCKET_PATH = (Path(_RUNTIME_DIR) if _RUNTIME_DIR else Path.home() / ".local/share/echoclip") / "echoclip.sock"
+
+class DaemonNotRunning(Exception):
+    """Nothing is listening on the socket (`echoclip start` isn't running)."""
+
+def encode(message: Dict[str, Any]) -> bytes:
+    """One protocol message: a JSON object on a single line."""
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+def request(message: Dict[str, Any], path: Path = SOCKET_PATH) -> Iterator[Dict[str, Any]]:
+    """
+    Sends a request to the running daemon and yields its replies until it
+    closes the connection (one reply, or two for a speak request with "wait").
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        sock.close()
+        raise DaemonNotRunning(f"No EchoClip daemon at {path}") from e
+
+    with sock, sock.makefile("rb") as replies:
+        sock.sendall(encode(message))
+        for line in replies:
+            yield json.loads(line)
+
+def is_listening(path: Path = SOCKET_PATH) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+            return True
+        except OSError:
+            return False
@@ -1,11 +1,186 @@
+import os
 import time
 import json
 import threading
 import random
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 from echoclip.config import config
 from echoclip.logger import logger
+from echoclip.persistence import WriteBehindPersister
+from echoclip.coordination import SharedKeyStore, key_id, open_store
+from echoclip.lazy import lazy_singletons
+from echoclip.metrics import metrics
+
+class RateWindow:
+    """
+    Sliding window of requests and their token counts.
+    Entries are kept in timestamp order with a running token total, so expiry
+    is amortized O(1) and RPM/TPM lookups are O(1).
+    """
+    def __init__(self, span: float = 60.0):
+        self.span = span
+        self.entries: Deque[List] = deque()  # [timestamp, tokens, entry id]
+        self.tokens = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.entries)
+
+    def expire(self, now: float):
+        cutoff = now - self.span
+        entries = self.entries
+        while entries and entries[0][0] <= cutoff:
+            self.tokens -= entries.popleft()[1]
+
+    def record(self, timestamp: float, tokens: int, entry_id: Optional[str] = None) -> List:
+        entry = [timestamp, tokens, entry_id]
+        self.entries.append(entry)
+        self.tokens += tokens
+        return entry
+
+    def oldest(self) -> Optional[float]:
+        return self.entries[0][0] if self.entries else None
+
+    def find(self, entry: List) -> Optional[List]:
+        """The window's entry with the same id as `entry` (windows are rebuilt from the shared store)."""
+        for candidate in self.entries:
+            if candidate[2] == entry[2]:
+                return candidate
+        return None
+
+    def tokens_free_at(self, needed: int) -> float:
+        """Returns the time at which at least `needed` tokens will have left the window."""
+        freed = 0
+        for timestamp, tokens, _ in self.entries:
+            freed += tokens
+            if freed >= needed:
+                return timestamp + self.span
+        return 0.0
+
+# Pacing spreads a key's requests slightly wider than its RPM limit strictly requires
+PACING_FACTOR = 1.3
+
+# Daily quotas reset at midnight Pacific time
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:  # No tz database; UTC is off by a few hours at worst
+    QUOTA_TIMEZONE = timezone.utc
+
+def quota_day(timestamp: float) -> str:
+    """The quota day (ISO date) a request at `timestamp` counts towards."""
+    return datetime.fromtimestamp(timestamp, QUOTA_TIMEZONE).date().isoformat()
+
+def next_quota_reset(timestamp: float) -> float:
+    """The time at which the quota day containing `timestamp` ends."""
+    local = datetime.fromtimestamp(timestamp, QUOTA_TIMEZONE)
+    midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time(), QUOTA_TIMEZONE)
+    return midnight.timestamp()
+
+class CircuitBreaker:
+    """
+    Health of one key. Closed: used normally. Open: skipped until `open_until`.
+    Half-open: the next reservation is a probe; its outcome closes the
+    breaker or reopens it for twice as long.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = 3, base_delay: float = 30.0, max_delay: float = 600.0):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def available_at(self, now: float) -> float:
+        """Earliest time the key may take a request."""
+        if self.state == self.OPEN and now >= self.open_until:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return now
+        start = max(now, self.open_until)
+        if self.probing:
+            # One probe at a time; assume it fails until we hear otherwise
+            return start + self.base_delay
+        return start
+
+    def on_reserve(self):
+        if self.state != self.CLOSED:
+            self.probing = True
+
+    def on_release(self):
+        self.probing = False
+
+    def hold(self, until: float):
+        """Keeps the key out of rotation until `until`, a cooldown another process recorded."""
+        if until > self.open_until:
+            self.state = self.OPEN
+            self.open_until = until
+            self.probing = False
+
+    def trip(self, now: float, duration: Optional[float] = None):
+        """Opens the breaker for `duration`, or for an exponentially growing delay."""
+        if duration is None:
+            duration = min(self.max_delay, self.base_delay * 2 ** self.trips)
+            duration *= random.uniform(0.8, 1.2)
+        self.trips += 1
+        self.state = self.OPEN
+        self.open_until = now + duration
+        self.probing = False
+
+    def success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.probing = False
+
+    def failure(self, now: float):
+        self.failures += 1
+        # A failed probe reopens the breaker, even if available_at() never saw it half-open
+        probe = self.probing or self.state == self.HALF_OPEN or (self.state == self.OPEN and now >= self.open_until)
+        self.probing = False
+        if probe or self.failures >= self.threshold:
+            self.trip(now)
+
+class Reservation:
+    """
+    A request slot on a key, usable once `eta` (wall-clock time) is reached.
+    `reason` names the limit that set the eta: "none", "circuit", "queued",
+    "pacing", "rpm" or "tpm".
+    """
+    def __init__(self, key: str, eta: float, tokens: int, entry: List, previous_last_used: float, reason: str = "none"):
+        self.key = key
+        self.eta = eta
+        self.reason = reason
+        self.tokens = tokens
+        self.entry = entry
+        self.previous_last_used = previous_last_used
+
+    def wait(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        Sleeps until the slot opens. Returns False if stop_event was set first.
+        Must be called without holding any KeyManager lock.
+        """
+        delay = self.eta - time.time()
+        if stop_event is not None:
+            if stop_event.wait(max(delay, 0)):
+                return False
+        elif delay > 0:
+            time.sleep(delay)
+        self.record_wait(max(delay, 0))
+        return True
+
+    def record_wait(self, seconds: float):
+        metrics.observe("keys.wait", seconds)
+        if seconds > 0:
+            metrics.observe(f"keys.wait.{self.reason}", seconds)
 
 class KeyManager:
     def __init__(self, state_file: Path = Path.home() / ".local/share/echoclip/key_state.json"):
@@ -13,11 +188,63 @@ class KeyManager:
         self.lock = threading.Lock()
         self.keys = config.gemini_api_keys
         self.state = self._load_state()
+        self.persister = WriteBehindPersister(self.state_file, self._snapshot_state)
         
-        self.runtime_locks = {k: threading.Lock() for k in self.keys}
-        self.request_timestamps: Dict[str, List[float]] = {k: [] for k in self.keys} 
-        self.token_timestamps: Dict[str, List[Tuple[float, int]]] = {k: [] for k in self.keys}
-        self.cooldowns: Dict[str, float] = {}
+        self.windows: Dict[str, RateWindow] = {k: RateWindow() for k in self.keys}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.exhausted_listeners: List[Callable[[str], None]] = []
+        # Other processes using the same keys (see echoclip.coordination)
+        self.shared: Optional[SharedKeyStore] = open_store(config.coordination_path) if config.coordination_enabled else None
+
+    @contextmanager
+    def _locked(self, publish: bool = False):
+        """
+        Holds self.lock and, when coordinating with other processes, the
+        shared store: state, windows and cooldowns are refreshed from it on
+        entry and, with `publish`, written back on exit.
+        """
+        with self.lock:
+            if self.shared is not None and self.shared.failed:
+                self.shared = None  # Unusable since; it already warned
+            if self.shared is None:
+                yield
+                return
+            with self.shared.locked() as changed:
+                if changed is not None:
+                    self._import_shared(changed, time.time())
+                yield
+                if publish:
+                    self.shared.write(self._export_shared())
+
+    def _import_shared(self, shared: Dict[str, Dict], now: float):
+        """Adopts the shared state of our keys. Caller holds self.lock and the store."""
+        by_id = {key_id(k): k for k in set(config.gemini_api_keys) | set(self.state)}
+        for shared_id, shared_state in shared.items():
+            key = by_id.get(shared_id)
+            if key is None:
+                continue  # Another process's key
+            key_state = dict(shared_state)
+            entries = key_state.pop("entries", [])
+            rest_until = key_state.pop("rest_until", 0)
+            self.state[key] = key_state
+
+            window = self.windows[key] = RateWindow()
+            for timestamp, tokens, entry_id in entries:
+                window.record(timestamp, tokens, entry_id)
+            if rest_until > now:
+                self._breaker(key).hold(rest_until)
+
+    def _export_shared(self) -> Dict[str, Dict]:
+        """Our keys' state for the shared store. Caller holds self.lock and the store."""
+        exported = {}
+        for key in set(self.state) | set(self.windows):
+            key_state = {"total_tokens": 0, "total_requests": 0, "last_used": 0, **self.state.get(key, {})}
+            window = self.windows.get(key)
+            key_state["entries"] = list(window.entries) if window is not None else []
+            breaker = self.breakers.get(key)
+            key_state["rest_until"] = breaker.open_until if breaker is not None and breaker.state != CircuitBreaker.CLOSED else 0
+            exported[key_id(key)] = key_state
+        return exported
 
     def _load_state(self) -> Dict:
         if not self.state_file.exists():
@@ -29,174 +256,306 @@ class KeyManager:
             logger.warning(f"Failed to load key state: {e}")
             return {}
 
+    def _snapshot_state(self) -> Dict:
+        return {k: dict(v) for k, v in list(self.state.items())}
+
     def _save_state(self):
-        self.state_file.parent.mkdir(parents=True, exist_ok=True)
-        try:
-            with open(self.state_file, "w") as f:
-                json.dump(self.state, f, indent=2)
-        except Exception as e:
-            logger.warning(f"Failed to save key state: {e}")
+        """Schedules a write-behind flush of key_state.json."""
+        self.persister.mark_dirty()
 
-    def _cleanup_timestamps(self, key: str, now: float):
-        if key in self.request_timestamps:
-            self.request_timestamps[key] = [t for t in self.request_timestamps[key] if t > now - 60]
-        
-        if key in self.token_timestamps:
-            self.token_timestamps[key] = [(t, v) for t, v in self.token_timestamps[key] if t > now - 60]
+    def flush_state(self):
+        """Writes pending key state to disk immediately."""
+        self.persister.flush()
 
-    def mark_cooldown(self, key: str, duration: float = 60.0):
-        with self.lock:
-            self.cooldowns[key] = time.time() + duration
-            logger.warning(f"Key ...{key[-4:]} marked for cooldown for {duration}s")
+    def _window(self, key: str, now: float) -> RateWindow:
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = RateWindow()
+        window.expire(now)
+        return window
 
-    def get_best_key(self, estimated_tokens: int = 0) -> Optional[str]:
-        # Refresh keys from config in case they changed
-        self.keys = config.gemini_api_keys
-        
+    def _requests_today(self, key: str, day: str) -> int:
+        key_state = self.state.get(key, {})
+        return key_state.get("requests_today", 0) if key_state.get("day") == day else 0
+
+    def _has_daily_quota(self, key: str, day: str) -> bool:
+        if self.state.get(key, {}).get("exhausted_day") == day:
+            return False
+        rpd_limit = config.rpd_limit
+        return rpd_limit <= 0 or self._requests_today(key, day) < rpd_limit
+
+    def mark_daily_exhausted(self, key: str):
+        """Records that the API refused `key` for the rest of the quota day."""
+        with self._locked(publish=True):
+            key_state = self.state.setdefault(key, {"total_tokens": 0, "total_requests": 0, "last_used": 0})
+            key_state["exhausted_day"] = quota_day(time.time())
+            self._save_state()
+        logger.warning(f"Key ...{key[-4:]} is out of daily quota until the reset.")
+
+    def _breaker(self, key: str) -> CircuitBreaker:
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker()
+        return breaker
+
+    def mark_cooldown(self, key: str, duration: Optional[float] = None):
+        """
+        Takes `key` out of rotation for `duration` seconds (e.g. a server retry
+        hint), or for an exponentially growing delay if not given.
+        """
+        with self._locked(publish=True):
+            breaker = self._breaker(key)
+            breaker.trip(time.time(), duration)
+            logger.warning(f"Key ...{key[-4:]} resting for {breaker.open_until - time.time():.0f}s")
+
+    def record_success(self, key: str):
         with self.lock:
-            available = [k for k in self.keys if k not in config.exhausted_keys]
-            if not available:
-                return None
-            
-            now = time.time()
-            active_keys = []
-            min_cooldown_expiry = float('inf')
-            
-            for key in available:
-                if key in self.cooldowns:
-                    if now >= self.cooldowns[key]:
-                        del self.cooldowns[key]
-                        active_keys.append(key)
-                    else:
-                        min_cooldown_expiry = min(min_cooldown_expiry, self.cooldowns[key])
-                else:
-                    active_keys.append(key)
-            
-            if not active_keys and available:
-                wait_time = min_cooldown_expiry - now
-                if wait_time > 0:
-                    logger.info(f"All keys in cooldown. Waiting {wait_time:.2f}s...")
-                    time.sleep(wait_time + 0.1)
-                    
-                    now = time.time()
-                    for key in available:
-                        if key in self.cooldowns and now >= self.cooldowns[key]:
-                            del self.cooldowns[key]
-                            active_keys.append(key)
-            
-            if not active_keys:
-                return None
+            breaker = self.breakers.get(key)
+            if breaker is not None and breaker.state != CircuitBreaker.CLOSED:
+                logger.info(f"Key ...{key[-4:]} recovered")
+            if breaker is not None:
+                breaker.success()
 
-            random.shuffle(active_keys)
-            
-            best_key = None
-            lowest_load_score = float('inf')
-            
-            rpm_limit = config.rate_limits["rpm"]
-            tpm_limit = config.rate_limits["tpm"]
-
-            for key in active_keys:
-                if key not in self.request_timestamps:
-                    self.request_timestamps[key] = []
-                if key not in self.token_timestamps:
-                    self.token_timestamps[key] = []
-
-                self._cleanup_timestamps(key, now)
-                
-                current_rpm = len(self.request_timestamps[key])
-                current_tpm = sum(t[1] for t in self.token_timestamps[key])
-                
-                rpm_load = current_rpm / rpm_limit if rpm_limit > 0 else 1.0
-                tpm_load = current_tpm / tpm_limit if tpm_limit > 0 else 1.0
-                
-                if current_rpm >= rpm_limit or current_tpm + estimated_tokens > tpm_limit:
-                    load_score = 1000 + rpm_load + tpm_load
-                else:
-                    load_score = max(rpm_load, tpm_load)
-                
-                if load_score < lowest_load_score:
-                    lowest_load_score = load_score
-                    best_key = key
-            
-            return best_key
-
-    def acquire(self, key: str, estimated_tokens: int = 0):
+    def record_failure(self, key: str):
+        """Counts a transient failure; enough of them in a row open the key's breaker."""
+        with self._locked(publish=True):
+            breaker = self._breaker(key)
+            breaker.failure(time.time())
+            if breaker.state == CircuitBreaker.OPEN:
+                logger.warning(f"Key ...{key[-4:]} failing, skipped for {breaker.open_until - time.time():.0f}s")
+
+    def _earliest_slot(self, key: str, estimated_tokens: int, now: float) -> Tuple[float, str]:
+        """
+        Returns the earliest time a request on `key` satisfies cooldown, pacing,
+        RPM and TPM limits, given everything already reserved, and the limit
+        that determined it. Caller holds self.lock.
+        """
         rpm_limit = config.rate_limits["rpm"]
         tpm_limit = config.rate_limits["tpm"]
-        
-        lock = self.runtime_locks.get(key)
-        if not lock:
-            lock = threading.Lock()
-            self.runtime_locks[key] = lock
-            
-        with lock:
+        eta, reason = now, "none"
+
+        def constrain(candidate: float, name: str):
+            nonlocal eta, reason
+            if candidate > eta:
+                eta, reason = candidate, name
+
+        # Circuit breaker (rate-limited or failing keys rest until it reopens)
+        breaker = self.breakers.get(key)
+        if breaker is not None:
+            constrain(breaker.available_at(now), "circuit")
+
+        window = self._window(key, now)
+        if window.entries:
+            # Reservations on a key are handed out in order
+            constrain(window.entries[-1][0], "queued")
+
+        # Pacing
+        if rpm_limit > 0:
+            min_interval = (60.0 / rpm_limit) * PACING_FACTOR
+            last_used = self.state.get(key, {}).get("last_used", 0)
+            constrain(last_used + min_interval, "pacing")
+
+        # RPM: the slot opens once enough of the window has expired
+        if window.requests >= rpm_limit and window.entries:
+            constrain(window.entries[window.requests - rpm_limit][0] + window.span, "rpm")
+
+        # TPM
+        if window.tokens + estimated_tokens > tpm_limit:
+            needed = (window.tokens + estimated_tokens) - tpm_limit
+            constrain(window.tokens_free_at(needed), "tpm")
+
+        return eta, reason
+
+    def _load_score(self, key: str, day: str) -> float:
+        rpm_limit = config.rate_limits["rpm"]
+        tpm_limit = config.rate_limits["tpm"]
+        window = self.windows[key]
+        rpm_load = window.requests / rpm_limit if rpm_limit > 0 else 1.0
+        tpm_load = window.tokens / tpm_limit if tpm_limit > 0 else 1.0
+        # Daily load makes equally free keys share the day's budget evenly
+        rpd_limit = config.rpd_limit
+        rpd_load = self._requests_today(key, day) / rpd_limit if rpd_limit > 0 else 0.0
+        return max(rpm_load, tpm_load, rpd_load)
+
+    def _schedule(self, estimated_tokens: int, now: float, keys: Optional[List[str]] = None) -> Optional[Tuple[str, float, str]]:
+        """
+        Picks the key with the earliest feasible slot, breaking ties by load.
+        Returns (key, eta, reason). Caller holds self.lock.
+        """
+        if keys is None:
+            # Refresh keys from config in case they changed
+            self.keys = config.gemini_api_keys
+            keys = [k for k in self.keys if k not in config.exhausted_keys]
+        # Keys out of daily quota would only collect 429s until the reset
+        day = quota_day(now)
+        keys = [k for k in keys if self._has_daily_quota(k, day)]
+        if not keys:
+            return None
+
+        candidates = list(keys)
+        random.shuffle(candidates)
+
+        best = None
+        for key in candidates:
+            eta, reason = self._earliest_slot(key, estimated_tokens, now)
+            score = (eta, self._load_score(key, day))
+            if best is None or score < best[0]:
+                best = (score, key, reason)
+
+        (eta, _), key, reason = best
+        return key, eta, reason
+
+    def request_rate(self) -> float:
+        """Sustainable requests per second across all usable keys, given RPM and pacing."""
+        rpm_limit = config.rate_limits["rpm"]
+        day = quota_day(time.time())
+        usable = [
+            k for k in config.gemini_api_keys
+            if k not in config.exhausted_keys and self._has_daily_quota(k, day)
+        ]
+        if rpm_limit <= 0:
+            return 0.0
+        return len(usable) * rpm_limit / 60.0 / PACING_FACTOR
+
+    def get_best_key(self, estimated_tokens: int = 0) -> Optional[str]:
+        """Returns the key that could serve a request soonest, without reserving it."""
+        with self._locked():
+            scheduled = self._schedule(estimated_tokens, time.time())
+            return scheduled[0] if scheduled else None
+
+    def reserve(
+        self,
+        estimated_tokens: int = 0,
+        key: Optional[str] = None,
+        exclude: Optional[List[str]] = None,
+        max_wait: Optional[float] = None,
+    ) -> Optional[Reservation]:
+        """
+        Atomically reserves the earliest feasible request slot across all keys
+        (or on `key`, if given, or on any key but those in `exclude`). The slot
+        is counted against the key's limits immediately; the caller waits for
+        it with Reservation.wait() outside any lock. With `max_wait`, returns
+        None instead of a slot further away than that.
+        """
+        with metrics.span("keys.select"), self._locked(publish=True):
             now = time.time()
-            
-            if key not in self.request_timestamps:
-                self.request_timestamps[key] = []
-            if key not in self.token_timestamps:
-                self.token_timestamps[key] = []
-
-            # Pacing Check
-            if rpm_limit > 0:
-                min_interval = (60.0 / rpm_limit) * 1.3
-                last_used = self.state.get(key, {}).get("last_used", 0)
-                time_since_last = now - last_used
-                
-                if time_since_last < min_interval:
-                    wait_time = min_interval - time_since_last
-                    logger.debug(f"Pacing for key ...{key[-4:]}. Waiting {wait_time:.2f}s")
-                    time.sleep(wait_time)
-                    now = time.time()
-
-            # RPM Check
-            self._cleanup_timestamps(key, now)
-            
-            if len(self.request_timestamps[key]) >= rpm_limit:
-                if self.request_timestamps[key]:
-                    wait_time = 60 - (now - self.request_timestamps[key][0])
-                    if wait_time > 0:
-                        logger.debug(f"RPM limit for key ...{key[-4:]}. Waiting {wait_time:.2f}s")
-                        time.sleep(wait_time)
-                        now = time.time()
-                        self._cleanup_timestamps(key, now)
-            
-            # TPM Check
-            current_tpm = sum(t[1] for t in self.token_timestamps[key])
-            if current_tpm + estimated_tokens > tpm_limit:
-                 needed = (current_tpm + estimated_tokens) - tpm_limit
-                 freed = 0
-                 wait_until = now
-                 
-                 sorted_tokens = sorted(self.token_timestamps[key], key=lambda x: x[0])
-                 
-                 for ts, t in sorted_tokens:
-                     freed += t
-                     if freed >= needed:
-                         wait_until = ts + 60
-                         break
-                 
-                 wait_time = wait_until - now
-                 if wait_time > 0:
-                     logger.debug(f"TPM limit for key ...{key[-4:]}. Waiting {wait_time:.2f}s")
-                     time.sleep(wait_time)
-                     now = time.time()
-                     self._cleanup_timestamps(key, now)
-
-            self.request_timestamps[key].append(now)
-            self.token_timestamps[key].append((now, estimated_tokens))
-            
+            keys = [key] if key else None
+            if exclude:
+                keys = [k for k in config.gemini_api_keys if k not in config.exhausted_keys and k not in exclude]
+            scheduled = self._schedule(estimated_tokens, now, keys)
+            if not scheduled or (max_wait is not None and scheduled[1] - now > max_wait):
+                return None
+            key, eta, reason = scheduled
+
+            entry = self.windows[key].record(eta, estimated_tokens, os.urandom(8).hex())
+            if key in self.breakers:
+                self.breakers[key].on_reserve()
+
             if key not in self.state:
                 self.state[key] = {"total_tokens": 0, "total_requests": 0, "last_used": 0}
-            
-            self.state[key]["total_tokens"] += estimated_tokens
-            self.state[key]["total_requests"] += 1
-            self.state[key]["last_used"] = now
-            
+
+            key_state = self.state[key]
+            reservation = Reservation(key, eta, estimated_tokens, entry, key_state["last_used"], reason)
+            key_state["total_tokens"] += estimated_tokens
+            key_state["total_requests"] += 1
+            key_state["last_used"] = eta
+            day = quota_day(eta)
+            if key_state.get("day") != day:
+                key_state["day"] = day
+                key_state["requests_today"] = 0
+            key_state["requests_today"] = key_state.get("requests_today", 0) + 1
+
             self._save_state()
 
+        if eta > now:
+            logger.debug(f"Reserved key ...{key[-4:]}, slot opens in {eta - now:.2f}s ({reason})")
+        return reservation
+
+    def release(self, reservation: Reservation):
+        """Returns an unused reservation's slot, e.g. when the request was cancelled while waiting."""
+        with self._locked(publish=True):
+            if reservation.key in self.breakers:
+                self.breakers[reservation.key].on_release()
+            window = self.windows.get(reservation.key)
+            entry = window.find(reservation.entry) if window is not None else None
+            if entry is None:
+                return  # Already expired
+            window.entries.remove(entry)
+            window.tokens -= entry[1]
+
+            key_state = self.state[reservation.key]
+            key_state["total_tokens"] -= reservation.tokens
+            key_state["total_requests"] -= 1
+            if key_state["last_used"] == reservation.eta:
+                key_state["last_used"] = reservation.previous_last_used
+            if key_state.get("day") == quota_day(reservation.eta) and key_state.get("requests_today"):
+                key_state["requests_today"] -= 1
+
+            self._save_state()
+
+    def reconcile(self, reservation: Reservation, actual_tokens: int):
+        """Replaces a reservation's estimated tokens with the count the API reported."""
+        with self._locked(publish=True):
+            delta = actual_tokens - reservation.entry[1]
+            if not delta:
+                return
+            window = self._window(reservation.key, time.time())
+            # Once expired, the entry no longer counts against TPM
+            entry = window.find(reservation.entry)
+            if entry is not None:
+                entry[1] = actual_tokens
+                window.tokens += delta
+            reservation.entry[1] = actual_tokens
+            self.state[reservation.key]["total_tokens"] += delta
+            reservation.tokens = actual_tokens
+            self._save_state()
+
+    def acquire(self, key: str, estimated_tokens: int = 0) -> Optional[Reservation]:
+        """
+        Blocks until `key` may be used for a request of `estimated_tokens`, and
+        records it. Returns None, without waiting, if the key is out of daily quota.
+        """
+        reservation = self.reserve(estimated_tokens, key=key)
+        if reservation is None:
+            return None
+        reservation.wait()
+        return reservation
+
+    def daily_forecast(self) -> Dict:
+        """
+        Remaining daily capacity: requests left per key and in total (None if
+        there is no daily limit), and seconds until the quota day resets.
+        Keys the API reported as out of daily quota have 0 left.
+        """
+        with self._locked():
+            now = time.time()
+            day = quota_day(now)
+            rpd_limit = config.rpd_limit
+            keys = [k for k in config.gemini_api_keys if k not in config.exhausted_keys]
+            remaining = {}
+            for key in keys:
+                if self.state.get(key, {}).get("exhausted_day") == day:
+                    remaining[key] = 0
+                elif rpd_limit > 0:
+                    remaining[key] = max(0, rpd_limit - self._requests_today(key, day))
+                else:
+                    remaining[key] = None
+            return {
+                "day": day,
+                "resets_in": next_quota_reset(now) - now,
+                "limit": rpd_limit,
+                "keys": remaining,
+                "remaining": sum(remaining.values()) if rpd_limit > 0 else None,
+            }
+
+    def add_exhausted_listener(self, callback: Callable[[str], None]):
+        """Registers a callback invoked with the key whenever it is marked exhausted."""
+        self.exhausted_listeners.append(callback)
+
     def mark_exhausted(self, key: str):
         config.exhausted_keys.add(key)
         logger.warning(f"Key ...{key[-4:]} marked as exhausted.")
+        for callback in self.exhausted_listeners:
+            callback(key)
 
-key_manager = KeyManager()
+__getattr__ = lazy_singletons(__name__, {"key_manager": KeyManager})
@@ -0,0 +1,27 @@
+import sys
+import threading
+from typing import Any, Callable, Dict
+
+def lazy_singletons(module_name: str, factories: Dict[str, Callable[[], Any]]) -> Callable[[str], Any]:
+    """
+    Returns a module-level __getattr__ (PEP 562) that builds each named
+    singleton on first access and stores it in the module, so later lookups
+    (and `from module import name`) see a plain attribute.
+
+    Importing the module then costs nothing beyond its imports: the state a
+    singleton loads (key state, token model, audio buffers) is only read by
+    the commands that use it.
+    """
+    module = sys.modules[module_name]
+    lock = threading.RLock()
+
+    def __getattr__(name: str) -> Any:
+        factory = factories.get(name)
+        if factory is None:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        with lock:
+            if name not in module.__dict__:
+                setattr(module, name, factory())
+        return module.__dict__[name]
+
+    return __getattr__
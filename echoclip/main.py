@@ -1,19 +1,38 @@
+import os
+import sys
+import time
+import signal
 import typer
+from pathlib import Path
+from typing import Optional
 from rich.console import Console
-from rich.prompt import Prompt
 from echoclip.config import config
-from echoclip.service import install_service, start_service
-from echoclip.assets import generate_system_sounds
-from echoclip.input_handler import input_listener
 from echoclip.logger import logger
 
+# Commands import what they need (google-genai, numpy, sounddevice, pynput...)
+# themselves, so `echoclip speak` and friends start fast;
+# benchmarks/bench_import.py keeps it that way.
+
 app = typer.Typer()
 console = Console()
 
+def _check_rate_limits():
+    """Exits cleanly on invalid [rate_limits], for commands that schedule requests."""
+    try:
+        config.rate_limits
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
 @app.command()
 def init():
     """Initialize EchoClip configuration and services."""
+    from rich.prompt import Prompt
+    from echoclip.assets import generate_system_sounds
+    from echoclip.service import install_service
+
     console.print("[bold green]EchoClip Initialization[/bold green]")
+    _check_rate_limits()
     
     # 1. API Keys
     current_keys = config.gemini_api_keys
@@ -45,11 +64,215 @@ def init():
 @app.command()
 def start():
     """Start the EchoClip listener."""
+    from echoclip.assets import asset_store
+    from echoclip.daemon import DaemonServer, speech_queue
+    from echoclip.input_handler import input_listener
+    from echoclip.metrics import metrics
+
     logger.info("Starting EchoClip...")
+    _check_rate_limits()
+    # systemd stops the service with SIGTERM; exit normally so pending
+    # key state is flushed by the atexit handlers.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Load cues into memory now; missing ones are generated in the background
+    asset_store.prepare()
+    # Publish timings for `echoclip stats`
+    metrics.enable_export()
+    # Pre-synthesize copied text, if enabled
+    if config.speculation_enabled:
+        from echoclip.speculation import ClipboardWatcher, speculator
+        ClipboardWatcher(speculator).start()
+    # Accept `echoclip speak` requests
+    try:
+        DaemonServer(speech_queue).start()
+    except RuntimeError as e:
+        logger.error(str(e))
+        raise typer.Exit(1)
     try:
         input_listener.start()
     except KeyboardInterrupt:
         logger.info("Stopping...")
 
+@app.command()
+def speak(
+    text: Optional[str] = typer.Argument(None, help="Text to speak (default: read from stdin)."),
+    priority: int = typer.Option(0, "--priority", "-p", help="Queued texts with higher priority are spoken first."),
+    interrupt: bool = typer.Option(False, "--interrupt", "-i", help="Stop what is playing and speak this now."),
+    wait: bool = typer.Option(False, "--wait", "-w", help="Return only once the text has been spoken."),
+):
+    """Speak text through the running EchoClip (`echoclip start`)."""
+    from echoclip.ipc import DaemonNotRunning, request
+
+    if text is None or text == "-":
+        text = sys.stdin.read()
+    if not text.strip():
+        console.print("Nothing to speak.")
+        raise typer.Exit(1)
+
+    message = {"op": "speak", "text": text, "priority": priority, "interrupt": interrupt, "wait": wait}
+    try:
+        for reply in request(message):
+            if not reply["ok"]:
+                console.print(f"[red]{reply['error']}[/red]")
+                raise typer.Exit(1)
+            if reply.get("state") == "cancelled":
+                console.print(f"Job {reply['job']} was stopped before it finished.")
+                raise typer.Exit(1)
+            if "state" not in reply and reply["ahead"]:
+                console.print(f"Queued as job {reply['job']} ({reply['ahead']} ahead).")
+    except DaemonNotRunning:
+        console.print("[red]EchoClip is not running. Start it with `echoclip start`.[/red]")
+        raise typer.Exit(1)
+
+@app.command()
+def queue(clear: bool = typer.Option(False, "--clear", help="Stop playback and drop every queued text.")):
+    """Show (or clear) what the running EchoClip is speaking."""
+    from rich.table import Table
+    from echoclip.ipc import DaemonNotRunning, request
+
+    try:
+        reply = next(request({"op": "stop" if clear else "status"}))
+    except DaemonNotRunning:
+        console.print("[red]EchoClip is not running.[/red]")
+        raise typer.Exit(1)
+
+    if clear:
+        console.print(f"Stopped; dropped {reply['dropped']} queued texts.")
+        return
+    jobs = ([reply["current"]] if reply["current"] else []) + reply["queued"]
+    if not jobs:
+        console.print("Nothing playing.")
+        return
+    table = Table("Job", "Priority", "State", "Text")
+    for job in jobs:
+        state = "playing" if job is reply["current"] else "queued"
+        table.add_row(str(job["job"]), str(job["priority"]), state, job["text"])
+    console.print(table)
+
+def _print_daily_forecast():
+    from echoclip.keys import key_manager
+
+    forecast = key_manager.daily_forecast()
+    hours, minutes = divmod(int(forecast["resets_in"] // 60), 60)
+    if forecast["remaining"] is None:
+        console.print(f"No daily request limit configured. Quota day resets in {hours}h{minutes:02d}m.")
+        return
+    console.print(
+        f"Daily quota: {forecast['remaining']} of {forecast['limit'] * len(forecast['keys'])} requests left "
+        f"across {len(forecast['keys'])} keys, resets in {hours}h{minutes:02d}m (midnight Pacific)"
+    )
+    if forecast["resets_in"] > 0 and forecast["remaining"]:
+        per_hour = forecast["remaining"] / (forecast["resets_in"] / 3600)
+        console.print(f"Sustainable pace until the reset: {per_hour:.1f} requests/hour")
+
+@app.command()
+def stats():
+    """Show timing statistics of the running EchoClip listener."""
+    from rich.table import Table
+    from echoclip.metrics import load_snapshot
+
+    _check_rate_limits()
+    _print_daily_forecast()
+
+    snapshot = load_snapshot()
+    if snapshot is None:
+        console.print("No timing statistics yet. Are you running `echoclip start`?")
+        raise typer.Exit(1)
+
+    try:
+        os.kill(snapshot["pid"], 0)
+        status = f"pid {snapshot['pid']}"
+    except OSError:
+        status = f"pid {snapshot['pid']}, [yellow]no longer running[/yellow]"
+    console.print(
+        f"Up {(snapshot['updated'] - snapshot['started']) / 60:.1f} min ({status}), "
+        f"updated {time.time() - snapshot['updated']:.0f}s ago"
+    )
+
+    table = Table("Span", "Count", "Mean", "p50", "p90", "p99", "Max")
+    for name, h in sorted(snapshot["histograms"].items()):
+        table.add_row(name, str(h["count"]), *(f"{h[field] * 1000:.1f} ms" for field in ("mean", "p50", "p90", "p99", "max")))
+    console.print(table)
+
+    counters = snapshot["counters"]
+    cold = snapshot["histograms"].get("api.latency.cold")
+    warm = snapshot["histograms"].get("api.latency.warm")
+    if cold and warm:
+        console.print(
+            f"Connections: {counters.get('api.clients_created', 0):g} clients created, "
+            f"first request on a fresh client {cold['mean'] * 1000:.0f} ms vs {warm['mean'] * 1000:.0f} ms reused "
+            f"(mean, {warm['count']} reused requests)"
+        )
+
+    lookups = counters.get("cache.hits", 0) + counters.get("cache.misses", 0)
+    if lookups:
+        console.print(
+            f"Audio cache: {counters.get('cache.hits', 0) / lookups:.0%} hit rate over {lookups:g} lookups, "
+            f"{snapshot['gauges'].get('cache.bytes', 0) / 1024 / 1024:.1f} MB on disk, "
+            f"{counters.get('cache.evicted_bytes', 0) / 1024 / 1024:.1f} MB evicted"
+        )
+
+    values = sorted(counters.items()) + sorted(snapshot["gauges"].items())
+    if values:
+        table = Table("Counter", "Value")
+        for name, value in values:
+            table.add_row(name, f"{value:g}")
+        console.print(table)
+
+@app.command()
+def render(
+    source: Path = typer.Argument(..., exists=True, help="Text file or directory of .txt/.md files."),
+    output_dir: Optional[Path] = typer.Option(None, "--output", "-o", help="Directory for the WAV files (default: next to each source)."),
+    concurrency: int = typer.Option(0, help="Requests in flight (default: two per API key)."),
+):
+    """Render text files to WAV using the whole key pool. Interrupted renders resume."""
+    import asyncio
+    from rich.progress import Progress
+    from rich.table import Table
+    from echoclip.render import RenderJob, collect_sources, output_path, render_jobs
+
+    _check_rate_limits()
+    jobs = []
+    for path in collect_sources(source):
+        job = RenderJob(path, output_path(path, source, output_dir))
+        if not job.segments:
+            continue
+        if not job.load_progress():
+            console.print(f"Skipping {path} ({job.output} already exists)")
+            continue
+        if job.done:
+            console.print(f"Resuming {path} at segment {job.done + 1}/{len(job.segments)}")
+        jobs.append(job)
+
+    if not jobs:
+        console.print("Nothing to render.")
+        return
+
+    concurrency = concurrency or max(2, 2 * len(config.gemini_api_keys))
+    with Progress(console=console) as progress:
+        tasks = {
+            job: progress.add_task(job.source.name, total=len(job.segments), completed=job.done)
+            for job in jobs
+        }
+        report = asyncio.run(render_jobs(
+            jobs, concurrency,
+            on_progress=lambda job: progress.update(tasks[job], completed=job.done),
+        ))
+
+    console.print(
+        f"Rendered {report.segments} segments ({report.audio_seconds / 60:.1f} min of audio) "
+        f"in {report.elapsed:.1f}s: {report.per_minute(report.segments):.1f} segments/min, "
+        f"{report.per_minute(report.tokens):.0f} tokens/min"
+    )
+    if report.key_requests:
+        table = Table("Key", "Requests", "Utilization")
+        for key, utilization in report.key_utilization().items():
+            table.add_row(f"...{key[-4:]}", str(report.key_requests[key]), f"{utilization:.0%}")
+        console.print(table)
+    for path, error in report.failed:
+        console.print(f"[red]Failed {path}: {error} (run again to resume)[/red]")
+    if report.failed:
+        raise typer.Exit(1)
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import math
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from echoclip.persistence import WriteBehindPersister
+
+STATS_FILE = Path.home() / ".local/share/echoclip/stats.json"
+
+# Log-spaced bucket bounds in seconds: 1ms .. ~2 min, four per doubling
+BUCKET_BOUNDS = [0.001 * 2 ** (i / 4) for i in range(69)]
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations in seconds. Observing is O(1) and
+    percentiles are read from bucket upper bounds (within ~19%).
+    """
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value: float):
+        if value <= BUCKET_BOUNDS[0]:
+            index = 0
+        else:
+            index = min(len(BUCKET_BOUNDS), math.ceil(4 * math.log2(value / BUCKET_BOUNDS[0]) - 1e-9))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return max(self.min, min(bound, self.max))
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+class Metrics:
+    """
+    Process-wide timing histograms and counters for the hot path.
+
+    Recording only takes a short lock. When export is enabled (echoclip
+    start), a summary is written to stats.json in the background, at most once
+    per second, for `echoclip stats` to read.
+    """
+    def __init__(self, stats_file: Path = STATS_FILE):
+        self.stats_file = stats_file
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.started = time.time()
+        self.persister: Optional[WriteBehindPersister] = None
+
+    def enable_export(self):
+        if self.persister is None:
+            self.persister = WriteBehindPersister(self.stats_file, self.snapshot)
+            self.persister.mark_dirty()
+
+    def _changed(self):
+        if self.persister is not None:
+            self.persister.mark_dirty()
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+        self._changed()
+
+    def increment(self, name: str, amount: float = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+        self._changed()
+
+    def set_gauge(self, name: str, value: float):
+        with self.lock:
+            self.gauges[name] = value
+        self._changed()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Times the enclosed block into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "started": self.started,
+                "updated": time.time(),
+                "histograms": {name: h.summary() for name, h in self.histograms.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+def load_snapshot(stats_file: Path = STATS_FILE) -> Optional[Dict]:
+    """Reads the snapshot last exported by a running instance, if any."""
+    try:
+        with open(stats_file, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+metrics = Metrics()
@@ -0,0 +1,96 @@
+import re
+import unicodedata
+from typing import List, Tuple
+from urllib.parse import urlsplit
+from echoclip.config import config
+from echoclip.chunker import chunk_text
+from echoclip.tokens import token_estimator
+
+# Markup that is read aloud literally (or not at all) but still costs tokens
+_FENCED_CODE = re.compile(r"^[ \t]*(```|~~~)[^\n]*\n.*?^[ \t]*\1[ \t]*$", re.M | re.S)
+_INLINE_CODE = re.compile(r"`+([^`\n]+?)`+")
+_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_REFERENCE_LINK = re.compile(r"\[([^\]]+)\]\[[^\]]*\]")
+_LINK_DEFINITION = re.compile(r"^[ \t]*\[[^\]]+\]:[ \t]*\S+.*$", re.M)
+_AUTOLINK = re.compile(r"<((?:https?://|mailto:)[^<>\s]+)>", re.I)
+_HEADING = re.compile(r"^[ \t]*#{1,6}[ \t]+(.*?)[ \t#]*$", re.M)
+_BLOCKQUOTE = re.compile(r"^[ \t]*(?:>[ \t]?)+", re.M)
+_BULLET = re.compile(r"^[ \t]*[-*+][ \t]+", re.M)
+_RULE = re.compile(r"^[ \t]*([-*_])(?:[ \t]*\1){2,}[ \t]*$", re.M)
+_TABLE_SEPARATOR = re.compile(r"^[ \t]*\|?(?:[ \t]*:?-{3,}:?[ \t]*\|?)+[ \t]*$", re.M)
+_TABLE_ROW = re.compile(r"^[ \t]*\|(.*)\|[ \t]*$", re.M)
+_STRONG = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_EMPHASIS = re.compile(r"(?<![\w*])\*(?=\S)([^*\n]+?)(?<=\S)\*(?![\w*])|(?<![\w_])_(?=\S)([^_\n]+?)(?<=\S)_(?![\w_])")
+_STRIKE = re.compile(r"~~(?=\S)(.+?)(?<=\S)~~")
+_HTML_TAG = re.compile(r"</?[A-Za-z][A-Za-z0-9-]*(?:\s[^<>]*)?/?>")
+
+_URL = re.compile(r"\b(?:https?://|www\.)[^\s<>()\[\]{}\"']+", re.I)
+_URL_TRAILING = ".,;:!?"
+_SPACES = re.compile(r"[^\S\n]+")
+
+def strip_markdown(text: str) -> str:
+    """Reduces markdown (and stray HTML tags) to the text a reader would say."""
+    text = _IMAGE.sub(r"\1", text)
+    text = _LINK.sub(r"\1", text)
+    text = _REFERENCE_LINK.sub(r"\1", text)
+    text = _LINK_DEFINITION.sub("", text)
+    text = _AUTOLINK.sub(r"\1", text)
+    text = _HTML_TAG.sub("", text)
+    text = _RULE.sub("", text)
+    text = _HEADING.sub(r"\1", text)
+    text = _BLOCKQUOTE.sub("", text)
+    text = _BULLET.sub("", text)
+    text = _TABLE_SEPARATOR.sub("", text)
+    text = _TABLE_ROW.sub(lambda m: ", ".join(cell.strip() for cell in m.group(1).split("|") if cell.strip()), text)
+    text = _STRONG.sub(r"\2", text)
+    text = _EMPHASIS.sub(lambda m: m.group(1) or m.group(2), text)
+    return _STRIKE.sub(r"\1", text)
+
+def _shorten_url(match: "re.Match") -> str:
+    url = match.group()
+    stripped = url.rstrip(_URL_TRAILING)
+    host = urlsplit(stripped if "://" in stripped else f"http://{stripped}").hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    return host + url[len(stripped):]
+
+def replace_urls(text: str, mode: str) -> str:
+    """mode "shorten" keeps only the host name, "skip" drops URLs, anything else keeps them."""
+    if mode == "shorten":
+        return _URL.sub(_shorten_url, text)
+    if mode == "skip":
+        return _URL.sub(lambda m: m.group()[len(m.group().rstrip(_URL_TRAILING)):], text)
+    return text
+
+def clean_whitespace(text: str) -> str:
+    """Drops non-printable characters, collapses runs of spaces and removes blank lines."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    # Control and format characters (zero-width spaces, BOMs, soft hyphens...)
+    text = "".join(c for c in text if c == "\n" or c == "\t" or unicodedata.category(c)[0] != "C")
+    lines = (_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def normalize(text: str) -> str:
+    """Applies the [normalization] steps to text about to be synthesized."""
+    if not config.normalize_enabled:
+        return text
+    if config.normalize_code == "skip":
+        text = _FENCED_CODE.sub("", text)
+    text = _INLINE_CODE.sub(r"\1", text)
+    if config.normalize_markdown:
+        text = strip_markdown(text)
+    text = replace_urls(text, config.normalize_urls)
+    return clean_whitespace(text)
+
+def speech_chunks(text: str) -> Tuple[List[str], int]:
+    """
+    Normalizes text and splits it into synthesis chunks. Also returns the
+    estimated prompt tokens this saves, counting repeated chunks (which the
+    pipeline synthesizes once) a single time.
+    """
+    chunks = chunk_text(normalize(text), dedupe=config.normalize_enabled and config.normalize_dedupe)
+    if not text.strip():
+        return chunks, 0  # estimate() counts at least one token
+    saved = token_estimator.estimate(text) - sum(token_estimator.estimate(chunk) for chunk in set(chunks))
+    return chunks, max(0, saved)
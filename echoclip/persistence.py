@@ -0,0 +1,83 @@
+import os
+import json
+import atexit
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+from echoclip.logger import logger
+
+def atomic_write(path: Path, data: bytes):
+    """Writes data to path via a temp file + rename, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+class WriteBehindPersister:
+    """
+    Coalesces updates to a JSON file and writes them from a background thread.
+
+    Callers only mark the state dirty; a snapshot is taken and written at most
+    once per `delay` seconds, plus a final flush at interpreter exit.
+    """
+    def __init__(self, path: Path, snapshot: Callable[[], Any], delay: float = 1.0):
+        self.path = path
+        self.snapshot = snapshot
+        self.delay = delay
+        self.pending = False
+        self.wakeup = threading.Event()
+        self.closed = threading.Event()
+        self.write_lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.thread_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def mark_dirty(self):
+        self.pending = True
+        self.wakeup.set()
+        if self.thread is None:
+            with self.thread_lock:
+                if self.thread is None and not self.closed.is_set():
+                    self.thread = threading.Thread(target=self._run, name="echoclip-persister", daemon=True)
+                    self.thread.start()
+
+    def _run(self):
+        while not self.closed.is_set():
+            self.wakeup.wait()
+            # Debounce: let further updates accumulate before writing
+            self.closed.wait(self.delay)
+            self.flush()
+
+    def flush(self):
+        """Writes the current snapshot if there are pending updates."""
+        with self.write_lock:
+            # Clear before checking, so an update racing with this flush
+            # either lands in this snapshot or schedules another one.
+            self.wakeup.clear()
+            if not self.pending:
+                return
+            self.pending = False
+            try:
+                data = json.dumps(self.snapshot(), indent=2).encode("utf-8")
+                atomic_write(self.path, data)
+            except Exception as e:
+                logger.warning(f"Failed to save {self.path.name}: {e}")
+
+    def close(self):
+        """Stops the background thread and flushes pending updates."""
+        self.closed.set()
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        self.flush()
@@ -0,0 +1,357 @@
+import math
+import time
+import queue
+import asyncio
+import threading
+import concurrent.futures
+from collections import Counter, deque
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Set
+from echoclip.config import config
+from echoclip.client import tts_client
+from echoclip.cache import audio_cache
+from echoclip.keys import key_manager
+from echoclip.audio import audio_player
+from echoclip.normalize import speech_chunks
+from echoclip.speculation import speculator
+from echoclip.metrics import metrics
+from echoclip.lazy import lazy_singletons
+from echoclip.logger import logger
+
+SAMPLE_RATE = 24000
+BYTES_PER_SECOND = SAMPLE_RATE * 2  # 16-bit mono PCM
+
+class PrefetchWindow:
+    """
+    Decides how far ahead of playback to fetch.
+
+    The window covers the expected fetch latency (including the wait for a
+    key slot, derived from the pool's sustainable request rate) with some
+    slack, measured in seconds of audio rather than in chunks, so long texts
+    neither underrun nor grab quota and memory for audio far in the future.
+    """
+    def __init__(self, max_in_flight: int, slack: float = 1.5):
+        self.limit = max_in_flight
+        self.slack = slack
+        self.latency = 4.0  # Seconds per fetch, refined as fetches complete
+        self.seconds_per_char = 1 / 15.0  # Refined from received audio
+        self.playback_start: Optional[float] = None
+        self.yielded_seconds = 0.0
+        # Seconds below are playback time, so audio.speed shortens them
+        self.speed = config.audio_speed
+
+    def observe_fetch(self, elapsed: float, text: str, audio: bytes):
+        self.latency = 0.7 * self.latency + 0.3 * elapsed
+        if audio and text:
+            ratio = len(audio) / BYTES_PER_SECOND / len(text)
+            self.seconds_per_char = 0.7 * self.seconds_per_char + 0.3 * ratio
+
+    def observe_yield(self, audio: bytes):
+        if self.playback_start is None:
+            self.playback_start = time.monotonic()
+        self.yielded_seconds += self.playback_seconds(audio)
+
+    def playback_seconds(self, audio: bytes) -> float:
+        return len(audio) / BYTES_PER_SECOND / self.speed
+
+    def expected_seconds(self, text: str) -> float:
+        return len(text) * self.seconds_per_char / self.speed
+
+    def buffered_seconds(self) -> float:
+        """Audio handed to the player that has not been played yet."""
+        if self.playback_start is None:
+            return 0.0
+        return max(0.0, self.yielded_seconds - (time.monotonic() - self.playback_start))
+
+    def horizon(self) -> float:
+        rate = key_manager.request_rate()
+        slot_wait = 1.0 / rate if rate > 0 else self.latency
+        return (self.latency + slot_wait) * self.slack
+
+    def max_in_flight(self) -> int:
+        rate = key_manager.request_rate()
+        return min(self.limit, max(1, math.ceil(rate * self.horizon())))
+
+    def should_submit(self, ahead_seconds: float, in_flight: int) -> bool:
+        if in_flight == 0 and ahead_seconds <= 0:
+            return True
+        return in_flight < self.max_in_flight() and ahead_seconds < self.horizon()
+
+
+def _relay(source: asyncio.Future, target: asyncio.Future):
+    """Completes `target` like `source` (a done callback)."""
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+async def synthesize_chunks(chunks: List[str], warmed: Optional[concurrent.futures.Future] = None) -> AsyncIterator[bytes]:
+    """
+    Yields audio for `chunks` in order.
+
+    The first chunk comes from `warmed` (a speculative fetch started when the
+    text was copied) if given and successful; otherwise it is fetched with
+    the streaming API and yielded piece by piece as it arrives. Later chunks are fetched concurrently with the batch
+    API, as far ahead as the PrefetchWindow allows; a chunk with the same
+    text as an earlier one replays that chunk's audio. Closing or
+    cancelling the generator cancels every outstanding fetch.
+    """
+    if not chunks:
+        return
+
+    loop = asyncio.get_running_loop()
+    window = PrefetchWindow(max_in_flight=len(chunks))
+    backlog: Deque[int] = deque(range(1, len(chunks)))
+    slots: Dict[int, asyncio.Future] = {}  # Submitted but not yet yielded
+    repeats = {text for text, count in Counter(chunks).items() if count > 1}
+    shared: Dict[str, asyncio.Future] = {}  # Fetches of repeated chunk texts, by text
+    # Later copies of the first chunk wait for the streamed audio
+    head_shared: Optional[asyncio.Future] = None
+    if chunks[0] in repeats:
+        head_shared = shared[chunks[0]] = loop.create_future()
+    head_fallback: Optional[asyncio.Future] = None
+    running: Set[asyncio.Future] = set()
+    kick = asyncio.Event()  # Playback progressed
+    submitted = asyncio.Event()
+    head_done = False
+
+    async def fetch(index: int) -> bytes:
+        text = chunks[index]
+        # Cached chunks are resolved without spending quota (read off the loop: it's disk I/O)
+        cached = await asyncio.to_thread(audio_cache.get, text)
+        if cached is not None:
+            return cached
+        start = time.monotonic()
+        audio = await tts_client.aio.generate_speech(text, check_cache=False)
+        window.observe_fetch(time.monotonic() - start, text, audio)
+        return audio
+
+    def ahead_seconds() -> float:
+        ahead = window.buffered_seconds()
+        if not head_done:
+            ahead += window.expected_seconds(chunks[0])
+        for index, slot in slots.items():
+            if slot.done() and not slot.cancelled() and slot.exception() is None:
+                ahead += window.playback_seconds(slot.result())
+            else:
+                ahead += window.expected_seconds(chunks[index])
+        return ahead
+
+    def top_up() -> Optional[float]:
+        """
+        Submits the chunks the window admits. Returns how long until it may
+        admit another one, or None if that depends on a fetch or playback event.
+        """
+        while backlog:
+            ahead = ahead_seconds()
+            if not window.should_submit(ahead, len(running)):
+                if len(running) >= window.max_in_flight() or window.playback_start is None:
+                    return None
+                # Admitted again once buffered audio drains below the horizon
+                return max(ahead - window.horizon(), 0.05)
+
+            index = backlog.popleft()
+            # Repeated chunks replay an earlier fetch
+            if chunks[index] in shared:
+                slot = shared[chunks[index]]
+            else:
+                slot = asyncio.ensure_future(fetch(index))
+                running.add(slot)
+                slot.add_done_callback(running.discard)
+                if chunks[index] in repeats:
+                    shared[chunks[index]] = slot
+            slots[index] = slot
+            submitted.set()
+            metrics.set_gauge("pipeline.in_flight", len(running))
+        return None
+
+    async def prefetcher():
+        while backlog:
+            delay = top_up()
+            if not backlog:
+                break
+            kick.clear()
+            kicked = asyncio.ensure_future(kick.wait())
+            try:
+                await asyncio.wait(running | {kicked}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                kicked.cancel()
+
+    async def head_audio() -> AsyncIterator[bytes]:
+        if warmed is not None:
+            try:
+                audio = await asyncio.shield(asyncio.wrap_future(warmed))
+            except asyncio.CancelledError:
+                if not warmed.cancelled():
+                    raise  # We were cancelled, not the speculation
+                audio = b""
+            except Exception as e:
+                logger.warning(f"Speculative chunk 1 failed ({e}), streaming it")
+                audio = b""
+            if audio:
+                yield audio
+                return
+        async for data in tts_client.aio.generate_speech_stream(chunks[0]):
+            yield data
+
+    prefetch_task = asyncio.ensure_future(prefetcher())
+    try:
+        logger.info(f"Streaming chunk 1/{len(chunks)}...")
+        received = False
+        pending = b""
+        head_pieces: List[bytes] = []
+        try:
+            async for data in head_audio():
+                # Keep stream pieces aligned to whole 16-bit samples
+                data = pending + data
+                cut = len(data) - len(data) % 2
+                pending = data[cut:]
+                if not cut:
+                    continue
+                received = True
+                if head_shared is not None:
+                    head_pieces.append(data[:cut])
+                window.observe_yield(data[:cut])
+                kick.set()
+                yield data[:cut]
+        except Exception as e:
+            logger.error(f"Error streaming chunk 1: {e}")
+        head_done = True
+        kick.set()
+        if not received:
+            logger.warning("No audio for chunk 1")
+        if head_shared is not None:
+            if received:
+                head_shared.set_result(b"".join(head_pieces))
+            else:
+                # The stream failed; its later copies are fetched once more
+                head_fallback = asyncio.ensure_future(fetch(chunks.index(chunks[0], 1)))
+                head_fallback.add_done_callback(lambda fallback: _relay(fallback, head_shared))
+
+        # Yield the rest in order: 2, 3, ...
+        for index in range(1, len(chunks)):
+            submitted.clear()
+            while index not in slots:
+                await submitted.wait()
+                submitted.clear()
+
+            logger.info(f"Waiting for chunk {index + 1}/{len(chunks)}...")
+            try:
+                with metrics.span("pipeline.chunk_wait"):
+                    audio_data = await slots[index]
+            except Exception as e:
+                logger.error(f"Error generating chunk {index + 1}: {e}")
+                audio_data = b""
+            finally:
+                del slots[index]
+                kick.set()
+
+            if audio_data:
+                logger.info(f"Yielding audio for chunk {index + 1}")
+                window.observe_yield(audio_data)
+                yield audio_data
+            else:
+                logger.warning(f"No audio for chunk {index + 1}")
+    finally:
+        prefetch_task.cancel()
+        if head_fallback is not None:
+            head_fallback.cancel()
+        for slot in list(slots.values()) + list(shared.values()):
+            slot.cancel()
+
+async def play_async(audio: AsyncIterator[bytes], on_first_audio: Optional[Callable[[float], None]] = None):
+    """
+    Plays an async stream of audio through audio_player.
+    Returns when playback ends; if playback is stopped first (ESC), the
+    stream is closed and its outstanding fetches cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    feed: "queue.Queue" = queue.Queue()
+
+    def blocks():
+        while True:
+            data = feed.get()
+            if data is None:
+                return
+            yield data
+
+    async def produce():
+        async for data in audio:
+            feed.put(data)
+        feed.put(None)
+
+    player = loop.run_in_executor(None, lambda: audio_player.play_stream(blocks(), on_first_audio=on_first_audio))
+    producer = asyncio.ensure_future(produce())
+    try:
+        done, _ = await asyncio.wait({producer, player}, return_when=asyncio.FIRST_COMPLETED)
+        if producer in done:
+            producer.result()  # Propagate synthesis errors
+            await asyncio.shield(player)
+    finally:
+        if not player.done():
+            # Cancelled for another job or by stop(): a cue just started (the hotkey's) keeps playing
+            audio_player.stop_program()
+        feed.put(None)
+        producer.cancel()
+        await asyncio.wait({producer, player})
+        await audio.aclose()
+
+class SpeechPipeline:
+    """
+    Runs chunking, fetching and playback on a dedicated asyncio loop.
+    A new speak() replaces the one in progress; stop() cancels it right away.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, name="echoclip-pipeline", daemon=True)
+                self.thread.start()
+            return self.loop
+
+    def speak(self, text: str, on_first_audio: Optional[Callable[[float], None]] = None) -> concurrent.futures.Future:
+        """Schedules text for playback. The returned future fails if synthesis fails."""
+        return self.submit(self._speak(text, on_first_audio))
+
+    def submit(self, coroutine) -> concurrent.futures.Future:
+        """Runs a coroutine on the pipeline's event loop (where the async API clients live)."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def stop(self):
+        """Stops playback and cancels outstanding fetches."""
+        audio_player.stop()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel_current)
+
+    def _cancel_current(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def _speak(self, text: str, on_first_audio: Optional[Callable[[float], None]]):
+        previous = self.task
+        self.task = asyncio.current_task()
+        if previous is not None and not previous.done():
+            previous.cancel()
+            # Let it stop its player before ours starts
+            await asyncio.wait({previous})
+
+        # Normalize and split into sentence-aligned chunks (small first chunk for fast start)
+        chunks, saved = speech_chunks(text)
+        if not chunks:
+            return
+        if saved:
+            metrics.increment("normalize.tokens_saved", saved)
+        logger.info(f"Split text into {len(chunks)} chunks ({saved} tokens saved by normalization).")
+
+        await play_async(synthesize_chunks(chunks, speculator.take(chunks[0])), on_first_audio)
+
+__getattr__ = lazy_singletons(__name__, {"speech_pipeline": SpeechPipeline})
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import struct
+import asyncio
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from echoclip.config import config
+from echoclip.client import tts_client
+from echoclip.keys import key_manager
+from echoclip.chunker import chunk_text
+from echoclip.normalize import normalize
+from echoclip.tokens import token_estimator
+from echoclip.persistence import atomic_write
+from echoclip.logger import logger
+
+SAMPLE_RATE = 24000
+WAV_HEADER_SIZE = 44
+TEXT_SUFFIXES = {".txt", ".md"}
+
+def _wav_header(data_bytes: int) -> bytes:
+    """Canonical 44-byte header for 16-bit mono PCM."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16,
+        b"data", data_bytes,
+    )
+
+class WavWriter:
+    """
+    Streams PCM to a WAV file. The header is written with zero sizes and
+    patched on close, so audio goes to disk as it arrives. A partial file can
+    be reopened at `resume_bytes` of audio to continue an interrupted render.
+    """
+    def __init__(self, path: Path, resume_bytes: int = 0):
+        self.path = path
+        if resume_bytes:
+            self.file = open(path, "r+b")
+            self.file.truncate(WAV_HEADER_SIZE + resume_bytes)
+            self.file.seek(0, 2)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(path, "wb")
+            self.file.write(_wav_header(0))
+        self.data_bytes = resume_bytes
+
+    def write(self, pcm: bytes):
+        self.file.write(pcm)
+        self.data_bytes += len(pcm)
+        self.file.flush()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(_wav_header(self.data_bytes))
+        self.file.close()
+
+class RenderJob:
+    """
+    One input file: its segments, the output WAV and a progress manifest for
+    resuming. Segments finished ahead of a missing one wait in a .parts
+    directory, so a resumed render doesn't fetch them again.
+    """
+    def __init__(self, source: Path, output: Path):
+        self.source = source
+        self.output = output
+        self.manifest = output.with_name(output.name + ".progress")
+        self.parts = output.with_name(output.name + ".parts")
+        # Offline: no need for a small first chunk, use full-size requests throughout
+        text = normalize(source.read_text(encoding="utf-8"))
+        self.segments = chunk_text(text, first_chunk_tokens=config.chunk_max_tokens)
+        digest = hashlib.sha256(f"{config.model_name}\0{config.voice_id}\0".encode("utf-8"))
+        for segment in self.segments:
+            digest.update(segment.encode("utf-8") + b"\0")
+        self.fingerprint = digest.hexdigest()
+        self.done = 0
+        self.data_bytes = 0
+        self.writer: Optional[WavWriter] = None
+        self.results: Dict[int, bytes] = {}  # Finished out of order, waiting to be written
+
+    def load_progress(self) -> bool:
+        """Restores progress from an interrupted run. Returns False if the job is already complete."""
+        if self.output.exists() and not self.manifest.exists():
+            return False
+        resumed = False
+        try:
+            with open(self.manifest, "r") as f:
+                progress = json.load(f)
+            if progress.get("fingerprint") == self.fingerprint and (
+                    progress["data_bytes"] == 0
+                    or self.output.stat().st_size >= WAV_HEADER_SIZE + progress["data_bytes"]):
+                self.done = progress["done"]
+                self.data_bytes = progress["data_bytes"]
+                resumed = True
+        except (OSError, ValueError, KeyError):
+            pass
+        if resumed:
+            self._load_parts()
+        else:
+            shutil.rmtree(self.parts, ignore_errors=True)  # From another text or voice
+        return True
+
+    def _part(self, index: int) -> Path:
+        return self.parts / f"{index}.pcm"
+
+    def _load_parts(self):
+        for index in range(self.done, len(self.segments)):
+            try:
+                self.results[index] = self._part(index).read_bytes()
+            except OSError:
+                pass
+
+    def pending(self) -> List[int]:
+        """Indices of the segments that still need synthesizing."""
+        return [index for index in range(self.done, len(self.segments)) if index not in self.results]
+
+    def _save_progress(self):
+        atomic_write(self.manifest, json.dumps({
+            "fingerprint": self.fingerprint,
+            "segments": len(self.segments),
+            "done": self.done,
+            "data_bytes": self.data_bytes,
+        }).encode("utf-8"))
+
+    def complete(self, index: int, audio: bytes) -> int:
+        """
+        Stores a segment's audio and writes every segment that is now next in
+        line. Returns how many segments were written.
+        """
+        self.results[index] = audio
+        if index != self.done:
+            atomic_write(self._part(index), audio)
+            self._save_progress()  # Ties the part to this text's fingerprint
+            return 0
+        if self.writer is None:
+            self.writer = WavWriter(self.output, self.data_bytes)
+        first = self.done
+        while self.done in self.results:
+            self.writer.write(self.results.pop(self.done))
+            self.done += 1
+        self.data_bytes = self.writer.data_bytes
+        if self.done == len(self.segments):
+            self.close()
+            self.manifest.unlink(missing_ok=True)
+            shutil.rmtree(self.parts, ignore_errors=True)
+        else:
+            # Audio must be on disk before the manifest claims it
+            self.writer.sync()
+            self._save_progress()
+            for written in range(first, self.done):
+                self._part(written).unlink(missing_ok=True)
+        return self.done - first
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+class RenderReport:
+    def __init__(self):
+        self.segments = 0
+        self.tokens = 0
+        self.audio_seconds = 0.0
+        self.elapsed = 0.0
+        self.key_requests: Dict[str, int] = {}
+        self.failed: List[Tuple[Path, str]] = []
+
+    def per_minute(self, count: float) -> float:
+        return count / self.elapsed * 60 if self.elapsed > 0 else 0.0
+
+    def key_utilization(self) -> Dict[str, float]:
+        """Requests sent per key as a fraction of what its RPM limit allowed over the run."""
+        rpm_limit = config.rate_limits["rpm"]
+        capacity = rpm_limit * self.elapsed / 60
+        return {key: (count / capacity if capacity > 0 else 0.0) for key, count in self.key_requests.items()}
+
+def collect_sources(path: Path) -> List[Path]:
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in TEXT_SUFFIXES)
+    return [path]
+
+def output_path(source: Path, root: Path, output_dir: Optional[Path]) -> Path:
+    if output_dir is None:
+        return source.with_suffix(".wav")
+    relative = source.relative_to(root) if root.is_dir() else Path(source.name)
+    return (output_dir / relative).with_suffix(".wav")
+
+async def render_jobs(
+    jobs: List[RenderJob],
+    concurrency: int,
+    on_progress: Optional[Callable[[RenderJob], None]] = None,
+) -> RenderReport:
+    """
+    Synthesizes every pending segment of `jobs`, `concurrency` requests at a
+    time. KeyManager paces the requests to the pool's limits; output is
+    written in order as soon as each segment's predecessors are done.
+    Once a segment of a file fails, its queued segments are left for the
+    next run, but those already in flight are still kept.
+    """
+    report = RenderReport()
+    queue: "asyncio.Queue[Tuple[RenderJob, int]]" = asyncio.Queue()
+    for job in jobs:
+        for index in job.pending():
+            queue.put_nowait((job, index))
+    failed: Dict[RenderJob, str] = {}
+
+    def on_request(key: str):
+        report.key_requests[key] = report.key_requests.get(key, 0) + 1
+
+    async def worker():
+        while True:
+            try:
+                job, index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if job in failed:
+                continue
+            segment = job.segments[index]
+            try:
+                audio = await tts_client.aio.generate_speech(segment, on_request=on_request)
+                if not audio:
+                    raise Exception("No audio data in response")
+            except Exception as e:
+                logger.error(f"Failed segment {index + 1} of {job.source}: {e}")
+                failed.setdefault(job, str(e))
+                continue
+            report.tokens += token_estimator.estimate(segment)
+            data_bytes = job.data_bytes
+            report.segments += job.complete(index, audio)
+            report.audio_seconds += (job.data_bytes - data_bytes) / (SAMPLE_RATE * 2)
+            if on_progress:
+                on_progress(job)
+
+    start = time.monotonic()
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        for job in jobs:
+            job.close()
+        report.elapsed = time.monotonic() - start
+        key_manager.flush_state()
+
+    report.failed = [(job.source, error) for job, error in failed.items()]
+    return report
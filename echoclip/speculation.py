@@ -0,0 +1,119 @@
+import time
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Deque, Optional
+from echoclip.config import config
+from echoclip.normalize import speech_chunks
+from echoclip.client import tts_client
+from echoclip.cache import audio_cache
+from echoclip.metrics import metrics
+from echoclip.lazy import lazy_singletons
+from echoclip.logger import logger
+
+class Speculator:
+    """
+    Synthesizes the first chunk of newly copied text ahead of the hotkey,
+    so speaking it starts without an API round trip.
+
+    Only the latest clipboard text is speculated: new text cancels the
+    previous speculation (a request still waiting for its key slot gives
+    the slot back). Texts over `speculation.max_chars` are skipped, and at
+    most `speculation.max_per_hour` speculative requests are made.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.text: Optional[str] = None  # Latest clipboard text seen
+        self.head: Optional[str] = None  # Its first chunk, if being speculated
+        self.future: Optional[concurrent.futures.Future] = None
+        self.used = False
+        self.started: Deque[float] = deque()  # Monotonic start times within the last hour
+
+    def offer(self, text: str):
+        """Called with new clipboard text; starts speculating on it if worthwhile."""
+        with self.lock:
+            if text == self.text:
+                return
+            self._discard()
+            self.text = text
+            if not text.strip() or len(text) > config.speculation_max_chars:
+                return
+            chunks, _ = speech_chunks(text)
+            if not chunks or audio_cache.get(chunks[0]) is not None:
+                return  # Nothing to say, or it already plays from the cache
+
+            now = time.monotonic()
+            while self.started and self.started[0] <= now - 3600:
+                self.started.popleft()
+            if len(self.started) >= config.speculation_max_per_hour:
+                logger.debug("Speculation budget spent for this hour")
+                return
+
+            from echoclip.pipeline import speech_pipeline  # Imports this module
+            self.started.append(now)
+            self.head = chunks[0]
+            self.used = False
+            self.future = speech_pipeline.submit(tts_client.aio.generate_speech(chunks[0], check_cache=False))
+            metrics.increment("speculation.started")
+            logger.debug(f"Speculating on: {chunks[0][:50]}...")
+
+    def claim(self, text: str):
+        """
+        The hotkey is about to speak `text`. A speculation already running on
+        it is kept for the pipeline to use, but none is started now: it would
+        only race the pipeline's own request.
+        """
+        with self.lock:
+            if text != self.text:
+                self._discard()
+                self.text = text
+
+    def take(self, head: str) -> Optional[concurrent.futures.Future]:
+        """The speculative audio for chunk `head` (done or still in flight), if any."""
+        with self.lock:
+            if self.future is None or head != self.head or self.future.cancelled():
+                return None
+            if not self.used:
+                self.used = True
+                metrics.increment("speculation.hits")
+            return self.future
+
+    def _discard(self):
+        if self.future is not None and not self.used:
+            if self.future.cancel():
+                metrics.increment("speculation.cancelled")
+            else:
+                metrics.increment("speculation.unused")
+        self.future = None
+        self.head = None
+
+class ClipboardWatcher:
+    """Polls the clipboard (there's no portable change notification) and offers new text to a Speculator."""
+    def __init__(self, speculator: Speculator):
+        self.speculator = speculator
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="echoclip-clipboard", daemon=True)
+        self.thread.start()
+        logger.info("Watching the clipboard to pre-synthesize copied text")
+
+    def _run(self):
+        import pyperclip
+
+        last = None
+        first = True
+        while True:
+            try:
+                text = pyperclip.paste()
+            except Exception as e:
+                logger.debug(f"Clipboard read failed: {e}")
+                text = last
+            # Whatever was copied before we started isn't new
+            if text != last and not first:
+                self.speculator.offer(text)
+            last = text
+            first = False
+            time.sleep(config.speculation_poll_interval)
+
+__getattr__ = lazy_singletons(__name__, {"speculator": Speculator})
@@ -0,0 +1,93 @@
+import re
+import json
+import math
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from echoclip.config import config
+from echoclip.persistence import WriteBehindPersister
+from echoclip.lazy import lazy_singletons
+from echoclip.logger import logger
+
+# Letters, digit runs, and single symbols; whitespace is free
+_TOKEN_PIECE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]")
+
+def base_estimate(text: str) -> float:
+    """
+    Tokenizer-free prompt size estimate. Unlike len(text) // 4 it accounts for
+    punctuation, digit runs (split every few digits) and accented words,
+    which tokenizers split more finely than plain ASCII.
+    """
+    total = 0.0
+    for match in _TOKEN_PIECE.finditer(text):
+        piece = match.group()
+        if piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        elif piece[0].isalpha():
+            total += 1 + (len(piece) - 1) // 6
+            if not piece.isascii():
+                total += 0.5
+        else:
+            total += 1
+    return total
+
+class TokenEstimator:
+    """
+    Estimates the prompt tokens of a TTS request for TPM reservations.
+
+    The base estimate is scaled by a per-model correction factor, learned as
+    an EWMA of actual/estimated from the usage_metadata of responses and
+    persisted so it survives restarts.
+    """
+    def __init__(self, state_file: Path = Path.home() / ".local/share/echoclip/token_model.json", alpha: float = 0.2):
+        self.state_file = state_file
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.models: Dict[str, Dict[str, float]] = self._load_state()
+        self.persister = WriteBehindPersister(self.state_file, self._snapshot_state)
+
+    def _load_state(self) -> Dict[str, Dict[str, float]]:
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load token model: {e}")
+            return {}
+
+    def _snapshot_state(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            return {model: dict(entry) for model, entry in self.models.items()}
+
+    def correction(self, model_name: Optional[str] = None) -> float:
+        entry = self.models.get(model_name or config.model_name)
+        return entry["ratio"] if entry else 1.0
+
+    def estimate(self, text: str, model_name: Optional[str] = None) -> int:
+        return max(1, math.ceil(base_estimate(text) * self.correction(model_name)))
+
+    def observe(self, text: str, actual_tokens: int, model_name: Optional[str] = None):
+        """Feeds back the prompt token count the API reported for `text`."""
+        base = base_estimate(text)
+        if base <= 0 or actual_tokens <= 0:
+            return
+        model_name = model_name or config.model_name
+        # Clamp single observations so one odd response can't swing the model
+        ratio = min(max(actual_tokens / base, 0.25), 4.0)
+        with self.lock:
+            entry = self.models.get(model_name)
+            if entry is None:
+                entry = self.models[model_name] = {"ratio": ratio, "samples": 0}
+            else:
+                entry["ratio"] += self.alpha * (ratio - entry["ratio"])
+            entry["samples"] += 1
+        self.persister.mark_dirty()
+
+def prompt_tokens(response) -> Optional[int]:
+    """The prompt token count from a response's usage_metadata, if reported."""
+    usage = getattr(response, "usage_metadata", None)
+    count = getattr(usage, "prompt_token_count", None) if usage is not None else None
+    return count or None
+
+__getattr__ = lazy_singletons(__name__, {"token_estimator": TokenEstimator})
@@ -0,0 +1,19 @@
+from echoclip.chunker import chunk_text, estimate_tokens
+
+def test_sentences_are_packed():
+    assert chunk_text("One. Two. Three.") == ["One. Two. Three."]
+
+def test_chunks_grow_up_to_the_limit():
+    chunks = chunk_text(" ".join(f"Sentence number {i} is here." for i in range(200)), 10, 80)
+    assert all(estimate_tokens(chunk) <= 80 for chunk in chunks)
+    assert estimate_tokens(chunks[0]) <= 10 < estimate_tokens(chunks[-2])
+
+def test_unbroken_run_is_cut_without_spaces():
+    chunks = chunk_text("x" * 5000, 40, 400)
+    assert all(estimate_tokens(chunk) <= 400 for chunk in chunks)
+    assert "".join(chunks) == "x" * 5000
+
+def test_words_around_a_cut_run_keep_their_spaces():
+    chunks = chunk_text("See " + "y" * 3000 + " ok.", 40, 400)
+    assert chunks[0] == "See"
+    assert "".join(chunks[1:]) == "y" * 3000 + " ok."
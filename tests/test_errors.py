@@ -0,0 +1,41 @@
+import asyncio
+from google.genai import errors as genai_errors
+from echoclip import errors
+
+def api_error(code, message="error", details=None):
+    return genai_errors.APIError(code, {"error": {"code": code, "message": message, "details": details or []}})
+
+def test_rate_limited_with_retry_hint():
+    details = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12s"}]
+    assert errors.classify(api_error(429, details=details)) == (errors.RATE_LIMITED, 12.0)
+
+def test_daily_quota():
+    details = [{
+        "@type": "type.googleapis.com/google.rpc.QuotaFailure",
+        "violations": [{"quotaId": "GenerateRequestsPerDayPerProjectPerModel-FreeTier"}],
+    }]
+    assert errors.classify(api_error(429, details=details)) == (errors.DAILY_QUOTA, None)
+
+def test_invalid_key():
+    assert errors.classify(api_error(403))[0] == errors.INVALID_KEY
+    assert errors.classify(api_error(400, "API key not valid. Please pass a valid API key."))[0] == errors.INVALID_KEY
+
+def test_server_errors_and_transport_are_transient():
+    assert errors.classify(api_error(503))[0] == errors.TRANSIENT
+    assert errors.classify(ConnectionResetError())[0] == errors.TRANSIENT
+    assert errors.classify(asyncio.TimeoutError())[0] == errors.TRANSIENT
+
+def test_bad_request_is_fatal():
+    assert errors.classify(api_error(400, "Invalid argument"))[0] == errors.FATAL
+
+def test_programming_errors_are_fatal():
+    # e.g. a response whose candidate has no content
+    for e in (AttributeError("'NoneType' object has no attribute 'parts'"), KeyError("x"), TypeError("bad")):
+        assert errors.classify(e) == (errors.FATAL, None)
+
+def test_unknown_errors_fall_back_to_the_message():
+    assert errors.classify(Exception("429 RESOURCE_EXHAUSTED"))[0] == errors.RATE_LIMITED
+    assert errors.classify(Exception("429 quota PerDay exceeded"))[0] == errors.DAILY_QUOTA
+
+def test_backoff_is_capped():
+    assert all(0 <= errors.backoff_delay(attempt, cap=5.0) <= 5.0 for attempt in range(20))
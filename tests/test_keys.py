@@ -0,0 +1,54 @@
+import pytest
+from echoclip.keys import CircuitBreaker
+
+@pytest.fixture
+def breaker(monkeypatch):
+    # No jitter, so reopen delays are exact
+    monkeypatch.setattr("echoclip.keys.random.uniform", lambda low, high: 1.0)
+    return CircuitBreaker(threshold=3, base_delay=30.0, max_delay=600.0)
+
+def test_closed_until_threshold(breaker):
+    breaker.failure(0)
+    breaker.failure(1)
+    assert breaker.available_at(2) == 2
+    breaker.failure(2)
+    assert breaker.available_at(3) == 32
+
+def test_success_closes(breaker):
+    breaker.trip(0)
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.available_at(1) == 1
+
+def test_probe_waits_for_open_until(breaker):
+    breaker.trip(0, 30)
+    assert breaker.available_at(10) == 30
+    assert breaker.available_at(30) == 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+def test_one_probe_at_a_time(breaker):
+    breaker.trip(0, 30)
+    breaker.on_reserve()
+    assert breaker.available_at(31) == 61
+    breaker.on_release()
+    assert breaker.available_at(31) == 31
+
+def test_failed_probe_reopens_for_longer(breaker):
+    breaker.trip(0, 30)
+    breaker.on_reserve()  # Reserved before available_at() noticed the breaker expired
+    breaker.failure(30)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.available_at(30.1) == 90
+
+def test_failed_probe_after_half_open(breaker):
+    breaker.trip(0)
+    breaker.available_at(31)
+    breaker.on_reserve()
+    breaker.failure(31)
+    assert breaker.available_at(31) == 31 + 60
+
+def test_hold_keeps_key_out(breaker):
+    breaker.hold(100)
+    assert breaker.available_at(50) == 100
+    breaker.hold(40)  # Earlier cooldowns don't shorten it
+    assert breaker.available_at(50) == 100
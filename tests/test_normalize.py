@@ -0,0 +1,80 @@
+import pytest
+from echoclip.config import config
+from echoclip.chunker import MIN_DEDUPE_TOKENS, chunk_text, estimate_tokens
+from echoclip.normalize import normalize, replace_urls, speech_chunks
+from echoclip.tokens import token_estimator
+
+REPEATED = "This paragraph repeats word for word, and is long enough to replay."
+
+@pytest.fixture
+def settings(monkeypatch):
+    """Sets [normalization] options for one test, on top of the defaults."""
+    options = {"enabled": True, "markdown": True, "urls": "shorten", "code": "skip", "dedupe": True}
+    monkeypatch.setitem(config._config, "normalization", options)
+    return options
+
+def test_markdown_is_stripped(settings):
+    text = "# Title\n\n**Bold**, *em* and ~~old~~ [a link](https://x.org)  `code`\n> quoted\n- item\n\n---"
+    assert normalize(text) == "Title\nBold, em and old a link code\nquoted\nitem"
+
+def test_markdown_kept_when_disabled(settings):
+    settings["markdown"] = False
+    assert normalize("# Title\n**Bold** [a link](https://x.org)") == "# Title\n**Bold** [a link](x.org)"
+
+def test_tables_become_rows(settings):
+    assert normalize("| a | b |\n|---|---|\n| 1 | 2 |") == "a, b\n1, 2"
+
+def test_snake_case_is_not_emphasis(settings):
+    assert normalize("call some_function_name now") == "call some_function_name now"
+
+def test_urls_shortened_to_host(settings):
+    assert normalize("See https://www.example.com/a/b?c=1.") == "See example.com."
+
+def test_urls_skipped(settings):
+    settings["urls"] = "skip"
+    assert normalize("Go to https://example.com/x, now") == "Go to , now"
+    assert replace_urls("www.example.com/x!", "skip") == "!"
+
+def test_urls_kept(settings):
+    settings["urls"] = "keep"
+    assert normalize("Go to https://example.com/x?y=1 now") == "Go to https://example.com/x?y=1 now"
+
+def test_code_blocks_skipped(settings):
+    assert normalize("Before\n```py\nprint(1)\n```\nAfter") == "Before\nAfter"
+
+def test_code_blocks_kept(settings):
+    settings["code"] = "keep"
+    assert normalize("Before\n~~~\nprint(1)\n~~~\nAfter") == "Before\n~~~\nprint(1)\n~~~\nAfter"
+
+def test_whitespace_and_invisible_characters(settings):
+    assert normalize("zero\u200bwidth   \t spaces\r\n\r\n\ufeffx ") == "zerowidth spaces\nx"
+
+def test_disabled_leaves_text_alone(settings):
+    settings["enabled"] = False
+    text = "# Title\n\n  **Bold**  https://example.com/a"
+    assert normalize(text) == text
+
+def test_repeated_paragraph_chunks_are_replayed():
+    chunks = chunk_text(f"{REPEATED}\nSomething else.\n{REPEATED}", dedupe=True)
+    assert chunks.count(REPEATED) == 2
+    assert "Something else." in chunks
+
+def test_short_repeats_stay_packed():
+    short = "OK, noted."
+    assert estimate_tokens(short) < MIN_DEDUPE_TOKENS
+    assert chunk_text(f"{short}\nNext.\n{short}", dedupe=True) == chunk_text(f"{short}\nNext.\n{short}")
+
+def test_dedupe_off_packs_repeats(settings):
+    settings["dedupe"] = False
+    chunks, _ = speech_chunks(f"{REPEATED}\n{REPEATED}")
+    assert REPEATED not in chunks
+
+def test_tokens_saved_counts_repeats_once(settings):
+    text = f"## {REPEATED}\n\n{REPEATED}  \n\n{REPEATED}"
+    chunks, saved = speech_chunks(text)
+    assert set(chunks) == {REPEATED}
+    assert saved == token_estimator.estimate(text) - token_estimator.estimate(REPEATED)
+
+def test_nothing_saved_on_empty_text(settings):
+    assert speech_chunks("") == ([], 0)
+    assert speech_chunks("  \n ") == ([], 0)